@@ -0,0 +1,252 @@
+import os
+import re
+import time
+import queue
+import pickle
+import argparse
+import numpy as np
+import multiprocessing as mp
+
+from typing import Dict, List, Tuple, Optional
+from collections import defaultdict
+
+from board_generator import (GeneratorConfig, DEFAULT_GENERATOR_CONFIG,
+                             generate_random_queens, generate_regions_jagged)
+from board_index import BoardIndex, get_board_hash, load_board_index
+
+
+# Assumed growth in seconds per board for each size step up, used for sizes with
+# no finished board yet
+GROWTH_PER_SIZE = 2.0
+# Assumed seconds per board when no size has finished a board yet
+DEFAULT_SECONDS_PER_BOARD = 1.0
+
+
+def generate_timed_board(n: int, config: Optional[GeneratorConfig] = None
+                         ) -> Tuple[int, float, np.ndarray, List[Tuple[int, int]]]:
+    """Generate one board, returns the size and seconds taken with it"""
+    start_time = time.time()
+    while True:
+        queens = generate_random_queens(n)
+        board = generate_regions_jagged(queens, n, config)
+        if board is not None:
+            return n, time.time() - start_time, board, queens
+
+
+class ThroughputScheduler:
+    """
+    Decides which size each free worker generates next so that every size's target
+    finishes at about the same time. Seconds per board are learned online from
+    finished boards, and workers are handed out in proportion to each size's
+    remaining work (boards left times seconds per board).
+    """
+    def __init__(self, targets: Dict[int, int]):
+        self.targets = dict(targets)
+        self.num_done = defaultdict(int)
+        self.total_seconds = defaultdict(float)
+        # Start times of the boards being generated for each size
+        self.in_flight = defaultdict(list)
+
+    def is_finished(self) -> bool:
+        return all(self.num_done[n] >= target for n, target in self.targets.items())
+
+    def get_seconds_per_board(self, n: int, now: float) -> float:
+        """
+        Mean seconds per board so far, extrapolated from the nearest smaller size
+        for sizes with no finished board. Boards still running count as at least
+        their time so far, so slow sizes aren't underestimated while they run.
+        """
+        if self.num_done[n] > 0:
+            estimate = self.total_seconds[n] / self.num_done[n]
+        else:
+            known_sizes = [size for size in self.targets
+                           if self.num_done[size] > 0 and size < n]
+            if known_sizes:
+                base_size = max(known_sizes)
+                estimate = self.total_seconds[base_size] / self.num_done[base_size] * \
+                    GROWTH_PER_SIZE ** (n - base_size)
+            else:
+                estimate = DEFAULT_SECONDS_PER_BOARD
+
+        longest_running = max((now - start for start in self.in_flight[n]), default=0)
+        return max(estimate, longest_running)
+
+    def get_remaining_work(self, n: int, now: float) -> float:
+        return (self.targets[n] - self.num_done[n]) * self.get_seconds_per_board(n, now)
+
+    def next_size(self, now: float) -> Optional[int]:
+        """
+        Size for the next free worker, the one whose remaining work per worker would
+        be largest with one more worker on it. None if every board still needed is
+        already being generated.
+        """
+        best_size, best_priority = None, None
+        for n, target in self.targets.items():
+            if self.num_done[n] + len(self.in_flight[n]) >= target:
+                continue
+            priority = self.get_remaining_work(n, now) / (len(self.in_flight[n]) + 1)
+            if best_priority is None or priority > best_priority:
+                best_size, best_priority = n, priority
+        return best_size
+
+    def start(self, n: int, now: float) -> None:
+        self.in_flight[n].append(now)
+
+    def finish(self, n: int, seconds: float, keep: bool = True) -> None:
+        """
+        Record a finished board. The time of boards that aren't kept still counts,
+        so estimates are in seconds per kept board.
+        """
+        # Results don't say which board they are, the oldest one is dropped as the
+        # longest running is what estimates use
+        self.in_flight[n].remove(min(self.in_flight[n]))
+        self.total_seconds[n] += seconds
+        if keep:
+            self.num_done[n] += 1
+
+
+def get_next_game_number(size_dir: str) -> int:
+    """Games are numbered 1.pkl, 2.pkl, ... in each board_size_<n> folder"""
+    numbers = [int(match.group(1)) for filename in os.listdir(size_dir)
+               if (match := re.fullmatch(r'(\d+)\.pkl', filename))]
+    return max(numbers, default=0) + 1
+
+
+def run_batch(targets: Dict[int, int], num_processes: int,
+              games_dir: str = "pregenerated_games",
+              config: Optional[GeneratorConfig] = None,
+              board_index: Optional[BoardIndex] = None) -> Dict[int, Dict]:
+    """
+    Generate targets[n] new boards of every size n on num_processes workers, saved
+    as games_dir/board_size_<n>/<k>.pkl after the games already there. Boards
+    already in board_index, or generated twice, are discarded and generated again.
+    Returns per size stats.
+    """
+    next_game_numbers = {}
+    for n in targets:
+        size_dir = os.path.join(games_dir, f"board_size_{n}")
+        os.makedirs(size_dir, exist_ok=True)
+        next_game_numbers[n] = get_next_game_number(size_dir)
+
+    scheduler = ThroughputScheduler(targets)
+    seen_hashes = set()
+    num_duplicates = defaultdict(int)
+    results = queue.Queue()
+    start_time = time.time()
+
+    with mp.Pool(processes=num_processes) as pool:
+        num_running = 0
+
+        def fill_workers() -> int:
+            num_started = 0
+            while num_running + num_started < num_processes:
+                n = scheduler.next_size(time.time())
+                if n is None:
+                    break
+                scheduler.start(n, time.time())
+                pool.apply_async(generate_timed_board, (n, config),
+                                 callback=results.put, error_callback=results.put)
+                num_started += 1
+            return num_started
+
+        num_running += fill_workers()
+        while not scheduler.is_finished():
+            result = results.get()
+            num_running -= 1
+            if isinstance(result, BaseException):
+                raise result
+
+            n, seconds, board, queens = result
+            board_hash = get_board_hash(board)
+            is_duplicate = board_hash in seen_hashes or \
+                (board_index is not None and board_index.contains_hash(board_hash))
+            scheduler.finish(n, seconds, keep=not is_duplicate)
+
+            if is_duplicate:
+                num_duplicates[n] += 1
+            else:
+                seen_hashes.add(board_hash)
+                save_path = os.path.join(games_dir, f"board_size_{n}",
+                                         f"{next_game_numbers[n]}.pkl")
+                with open(save_path, 'wb') as f:
+                    pickle.dump({"board": board, "queens": queens}, f)
+                if board_index is not None:
+                    board_index.add_hash(board_hash, save_path)
+                next_game_numbers[n] += 1
+
+                elapsed = time.time() - start_time
+                progress = ", ".join(f"{size}: {scheduler.num_done[size]}/{target}"
+                                     for size, target in sorted(targets.items()))
+                print(f"[{elapsed:.0f}s] Saved {save_path} ({progress})")
+
+            num_running += fill_workers()
+
+    return {n: {"num_boards": scheduler.num_done[n],
+                "num_duplicates": num_duplicates[n],
+                "sec_per_board": scheduler.total_seconds[n] /
+                                 max(scheduler.num_done[n] + num_duplicates[n], 1)}
+            for n in targets}
+
+
+def parse_targets(target_args: List[str]) -> Dict[int, int]:
+    """Parse size:count pairs like 8:100"""
+    targets = {}
+    for target_arg in target_args:
+        size, count = target_arg.split(":")
+        targets[int(size)] = int(count)
+    return targets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a mix of board sizes, sharing cores between sizes so "
+                    "that every size finishes at about the same time")
+    parser.add_argument('targets',
+                        nargs='+',
+                        help="Boards to generate per size as size:count, e.g. 8:100 12:20")
+    parser.add_argument('--num_processes', type=int, default=os.cpu_count())
+    parser.add_argument('--games_dir',
+                        type=str,
+                        default="pregenerated_games",
+                        help="Boards are saved to <games_dir>/board_size_<n>/<k>.pkl")
+    parser.add_argument('--index_path',
+                        type=str,
+                        default=None,
+                        help="Board deduplication index, built from games_dir if "
+                             "missing. Duplicate boards are generated again")
+    parser.add_argument('--temperature',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.temperature)
+    parser.add_argument('--banned_color_penalty',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.banned_color_penalty)
+    parser.add_argument('--same_color_weight',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.same_color_weight)
+
+    args = parser.parse_args()
+
+    targets = parse_targets(args.targets)
+    config = GeneratorConfig(temperature=args.temperature,
+                             banned_color_penalty=args.banned_color_penalty,
+                             same_color_weight=args.same_color_weight)
+
+    board_index = None
+    if args.index_path is not None:
+        board_index = load_board_index(args.index_path, [args.games_dir])
+        print(f"Loaded board index with {len(board_index)} boards")
+
+    print(f"Generating {sum(targets.values())} boards of sizes "
+          f"{sorted(targets)} on {args.num_processes} cores")
+    start_time = time.time()
+    stats = run_batch(targets, args.num_processes, args.games_dir, config, board_index)
+    elapsed_time = time.time() - start_time
+
+    if board_index is not None:
+        board_index.save()
+
+    print(f"{'size':>5} {'boards':>7} {'duplicates':>11} {'sec/board':>10}")
+    for n, size_stats in sorted(stats.items()):
+        print(f"{n:>5} {size_stats['num_boards']:>7} {size_stats['num_duplicates']:>11} "
+              f"{size_stats['sec_per_board']:>10.2f}")
+    print(f"Finished in {elapsed_time:.2f} seconds")
@@ -0,0 +1,16 @@
+import numpy as np
+
+
+# 8x8 board with a unique solution, shared by the tests. Read only so no test can
+# change it for the others, copy it to make variants
+UNIQUE_BOARD_8X8 = np.array([
+    [6, 6, 6, 6, 6, 6, 6, 4],
+    [6, 2, 5, 5, 0, 0, 6, 6],
+    [2, 2, 1, 1, 1, 0, 0, 6],
+    [2, 1, 1, 1, 1, 6, 6, 6],
+    [2, 2, 1, 1, 6, 6, 3, 3],
+    [1, 2, 1, 6, 6, 6, 6, 6],
+    [1, 1, 1, 1, 6, 6, 6, 6],
+    [1, 7, 1, 6, 6, 6, 6, 6]
+])
+UNIQUE_BOARD_8X8.flags.writeable = False
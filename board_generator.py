@@ -2,17 +2,83 @@ import random
 import os
 import pickle
 import time
+import math
+import heapq
+import queue
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import multiprocessing as mp
 
 from typing import List, Set, Tuple, Optional, Dict
-from collections import defaultdict
+from dataclasses import dataclass
 from glob import glob
 from functools import partial
 
-from get_solutions import find_up_to_two_solutions_optimized
+from get_solutions import count_search_nodes, has_solution_with_queen
+from board_index import BoardIndex, get_board_hash, load_board_index
+from region_features import RegionFeatures
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    """Hyperparameters for region growth in generate_regions_jagged"""
+    # Softmax temperature for sampling the next cell to color, higher = more random
+    temperature: float = 0.2
+    # Score added to a cell next to a square where the color is banned
+    banned_color_penalty: float = -10
+    # Score subtracted per neighbor of the same color, favors thin regions
+    same_color_weight: float = 1.5
+
+    def __post_init__(self):
+        # Scores are divided by the temperature before the softmax
+        if not self.temperature > 0:
+            raise ValueError(f"temperature must be positive, got {self.temperature}")
+
+
+DEFAULT_GENERATOR_CONFIG = GeneratorConfig()
+
+
+def _sum_4_neighbors(planes: np.ndarray) -> np.ndarray:
+    """For (n, n, k) planes, the sum over each square's up/down/left/right neighbors"""
+    counts = np.zeros(planes.shape, dtype=np.int32)
+    counts[1:] += planes[:-1]
+    counts[:-1] += planes[1:]
+    counts[:, 1:] += planes[:, :-1]
+    counts[:, :-1] += planes[:, 1:]
+    return counts
+
+
+def get_spindly_scores(board: np.ndarray, banned_colors: np.ndarray,
+                       config: GeneratorConfig = DEFAULT_GENERATOR_CONFIG
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score every frontier candidate, each uncolored square with each color next to
+    it, for how 'spindly' coloring it would be. Higher score = more jagged/spindly
+    (preferred). Returns the rows, cols, colors and scores of the candidates.
+
+    # Prefer positions that:
+    # 1. Have few neighbors of same color (creates thin regions)
+    # 2. Have many neighbors of different colors (creates jagged boundaries)
+    # 3. Not marking next to a banned color
+
+    banned_colors[row, col, color] is True where color is banned from the square.
+    """
+    num_colors = banned_colors.shape[2]
+    one_hot = board[:, :, None] == np.arange(num_colors)
+
+    # Neighbors of each color, and banned neighbors for each color, per square
+    same_color = _sum_4_neighbors(one_hot)
+    colored_neighbors = same_color.sum(axis=2, keepdims=True)
+    banned_neighbors = _sum_4_neighbors(banned_colors) > 0
+
+    is_candidate = (board == -1)[:, :, None] & (same_color > 0)
+    rows, cols, colors = np.nonzero(is_candidate)
+    same = same_color[rows, cols, colors]
+    diff = colored_neighbors[rows, cols, 0] - same
+    penalty = np.where(banned_neighbors[rows, cols, colors],
+                       config.banned_color_penalty, 0)
+    return rows, cols, colors, diff - same * config.same_color_weight + penalty
 
 
 def visualize_queens(positions: List[Tuple[int, int]], n: int = 8):
@@ -133,7 +199,9 @@ def generate_random_queens(n: int = 8) -> List[Tuple[int, int]]:
             return result
 
 
-def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
+def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8,
+                            config: Optional[GeneratorConfig] = None,
+                            stats: Optional[Dict[str, int]] = None
                             ) -> Optional[np.ndarray]:
     """
     Generate non-compact, jagged regions to increase likelihood of unique solutions.
@@ -142,21 +210,18 @@ def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
 
     Maintains invariant that the coloring state has a unique solution. If there is no
     possible next color assignment then it will return None
+
+    If stats is given, the number of uniqueness checks run is added to
+    stats["uniqueness_checks"], and the checks skipped thanks to the structural
+    pre-checks and the symmetry bans to stats["precheck_accepts"] and
+    stats["banned_rejects"].
     """
+    if config is None:
+        config = DEFAULT_GENERATOR_CONFIG
+
     # Pre-compute and cache adjacent cells
-    adjacent_cells_cache = {}
     adjacent_cells_diag_cache = {}
     
-    def get_adjacent_cells(row: int, col: int) -> List[Tuple[int, int]]:
-        if (row, col) not in adjacent_cells_cache:
-            adjacent = []
-            for dr, dc in [(-1,0), (1,0), (0,-1), (0,1)]:
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < n and 0 <= new_col < n:
-                    adjacent.append((new_row, new_col))
-            adjacent_cells_cache[(row, col)] = adjacent
-        return adjacent_cells_cache[(row, col)]
-    
     def get_adjacent_cells_diag(row: int, col: int) -> List[Tuple[int, int]]:
         if (row, col) not in adjacent_cells_diag_cache:
             adjacent = []
@@ -181,41 +246,6 @@ def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
         return exp_scores / exp_scores.sum()
 
     
-    def get_spindly_score(row: int, col: int, color: int, queens,
-                          square_to_disallowed_color_mapping) -> float:
-        """
-        Calculate how 'spindly' placing color at this position would be.
-        Higher score = more jagged/spindly (preferred)
-
-        # Prefer positions that:
-        # 1. Have few neighbors of same color (creates thin regions)
-        # 2. Have many neighbors of different colors (creates jagged boundaries)
-        # 3. Not marking next to a banned color
-        """
-        adjacent = get_adjacent_cells(row, col)
-        
-        # Count colored neighbors of same and different colors
-        same_color = 0
-        diff_color = 0
-        for adj_row, adj_col in adjacent:
-            if board[adj_row, adj_col] == color:
-                same_color += 1
-            elif board[adj_row, adj_col] != -1:
-                diff_color += 1
-
-        found_banned_square_adjacent = False
-        neighbors_of_potential_spot = get_adjacent_cells(row, col)
-
-        for n in neighbors_of_potential_spot:
-            if color in square_to_disallowed_color_mapping[n]:
-                found_banned_square_adjacent = True
-
-        color_banned_penalty = 0
-        if found_banned_square_adjacent:
-            color_banned_penalty = -10
-        
-        return diff_color - (same_color * 1.5) + color_banned_penalty
-    
     def is_symmetry_swap_constrained(proposed_color_queen_loc: Tuple[int, int],
                                      conflicting_queen_loc: Tuple[int, int],
                                      queens_to_check: List[Tuple[int, int]]
@@ -256,57 +286,66 @@ def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
     uncolored_cells = set((i, j) for i in range(n) for j in range(n) 
                          if board[i, j] == -1)
     
-    # Using symmetry test to mark disallowed colors
-    square_to_disallowed_colors = defaultdict(list)  # (row, col) -> list(int)
+    # Using symmetry test to mark disallowed colors, [row, col, color]
+    banned_colors = np.zeros((n, n, len(queens)), dtype=bool)
+
+    # Region spans for ruling out new solutions without a search
+    region_features = RegionFeatures(board)
 
     while uncolored_cells:
-        # Find all uncolored cells adjacent to colored regions
-        candidates = []
-        for row, col in uncolored_cells:
-            adjacent = get_adjacent_cells(row, col)
-            adj_colors = set(board[r, c] for r, c in adjacent if board[r, c] != -1)
-            
-            # For each adjacent color, calculate spindly score
-            for color in adj_colors:
-                score = get_spindly_score(row, col, color, queens, 
-                                          square_to_disallowed_colors)
-                candidates.append((score, (row, col, color)))
-        
-        assert len(candidates) != 0
+        # Score all uncolored cells adjacent to colored regions with each adjacent
+        # color at once
+        rows, cols, candidate_colors, scores = get_spindly_scores(board, banned_colors,
+                                                                  config)
+        assert len(scores) != 0
+        is_rejected = np.zeros(len(scores), dtype=bool)
 
         # Loop until we find a valid color choice for a square that doesnt result in 
         # the board having multiple solutions
         next_color_found = False        
         while not next_color_found:
             # If run out of valid candidates, we reached a dead end so return None
-            if not candidates:
+            remaining = np.flatnonzero(~is_rejected)
+            if len(remaining) == 0:
                 # print(repr(board))
                 # visualize_regions_queens(board, queens)
                 # print("Reached a dead end board coloring, restarting!")
                 return None
         
             # Probabilistically sample from candidates
-            scores = [score for score, _ in candidates]
-            positions = [(r, c, color) for _, (r, c, color) in candidates]
-            # TODO: test temperature hyperparam effect on generation time
-            probabilities = softmax([x for x in scores], temperature=0.2)
-            selected_idx = np.random.choice(len(positions), p=probabilities)
-            proposed_row, proposed_col, color = positions[selected_idx]
-            selected_score = scores[selected_idx]
+            probabilities = softmax(scores[remaining], temperature=config.temperature)
+            selected_idx = remaining[np.random.choice(len(remaining), p=probabilities)]
+            proposed_row = int(rows[selected_idx])
+            proposed_col = int(cols[selected_idx])
+            color = int(candidate_colors[selected_idx])
             
             # If the color at that position is banned, reject it
-            if color in square_to_disallowed_colors[(proposed_row, proposed_col)]:
-                candidates.remove((selected_score, (proposed_row, proposed_col, color)))
+            if banned_colors[proposed_row, proposed_col, color]:
+                is_rejected[selected_idx] = True
+                if stats is not None:
+                    stats["banned_rejects"] = stats.get("banned_rejects", 0) + 1
                 continue
 
-            # Test if the resulting board is single solution
+            # Test if the resulting board is single solution. Adding a square can only
+            # add solutions that put this color's queen on it, so that's all that
+            # needs checking instead of solving the whole board again. Often the
+            # region spans alone show a queen there can't work
             board[proposed_row, proposed_col] = color
-            solutions = find_up_to_two_solutions_optimized(board)
+            if region_features.rules_out_new_solution(proposed_row, proposed_col, color):
+                is_unique = True
+                if stats is not None:
+                    stats["precheck_accepts"] = stats.get("precheck_accepts", 0) + 1
+            else:
+                is_unique = not has_solution_with_queen(board,
+                                                        (proposed_row, proposed_col))
+                if stats is not None:
+                    stats["uniqueness_checks"] = stats.get("uniqueness_checks", 0) + 1
 
-            if len(solutions) == 1:
+            if is_unique:
                 # If so, mark next_color_found as True and visualize
                 next_color_found = True
                 uncolored_cells.remove((proposed_row, proposed_col))
+                region_features.add_square(proposed_row, proposed_col, color)
 
                 # Here we can do the symmetry check for when the proposed color is on 
                 #   the same row or column as the original queen
@@ -344,9 +383,8 @@ def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
                         )
                         if not symmetry_swap_constrained:
                             conflicting_queen_color = int(board[conflict_queen_loc])
-                            square_to_disallowed_colors[
-                                potential_conflicting_queen_loc
-                            ].append( conflicting_queen_color)
+                            banned_colors[potential_conflicting_queen_loc
+                                          + (conflicting_queen_color,)] = True
 
                 elif queen_of_proposed_color_loc[1] == proposed_col:
                     # Conflicting queen is the queen in the proposed row
@@ -370,20 +408,21 @@ def generate_regions_jagged(queens: List[Tuple[int, int]], n: int = 8
                         )
                         if not symmetry_swap_constrained:
                             conflicting_queen_color = int(board[conflict_queen_loc])
-                            square_to_disallowed_colors[
-                                potential_conflicting_queen_loc
-                            ].append(conflicting_queen_color)
+                            banned_colors[potential_conflicting_queen_loc
+                                          + (conflicting_queen_color,)] = True
 
             else:
                 # Found multiple solutions, undo color and remove from candidates
                 board[proposed_row, proposed_col] = -1
-                candidates.remove((selected_score, (proposed_row, proposed_col, color)))
+                is_rejected[selected_idx] = True
     
     return board
 
 
 def find_unique_solution_board(n: int, max_attempts: int = 1000000,
-                               verbose = False) -> Optional[np.ndarray]:
+                               verbose = False,
+                               config: Optional[GeneratorConfig] = None
+                               ) -> Optional[np.ndarray]:
     """
     Optimized version of board finder.
     """
@@ -391,7 +430,7 @@ def find_unique_solution_board(n: int, max_attempts: int = 1000000,
 
     for attempt_num in range(max_attempts):
         queens = generate_random_queens(n)
-        board = generate_regions_jagged(queens, n)
+        board = generate_regions_jagged(queens, n, config)
 
         if verbose:
             if (attempt_num+1) % 10 == 0:
@@ -410,21 +449,25 @@ def find_unique_solution_board(n: int, max_attempts: int = 1000000,
 
     return None
 
-def find_unique_solution_board_parallel(n: int, process_id: int = 0) -> Optional[Tuple[np.ndarray, List[Tuple[int, int]]]]:
+def find_unique_solution_board_parallel(n: int, process_id: int = 0,
+                                        config: Optional[GeneratorConfig] = None
+                                        ) -> Optional[Tuple[np.ndarray, List[Tuple[int, int]]]]:
     """Single process version of board finding for parallel execution"""
     while True:
         queens = generate_random_queens(n)
-        board = generate_regions_jagged(queens, n)
+        board = generate_regions_jagged(queens, n, config)
         
         if board is not None:
             print(f"Process {process_id} found a solution!")
             return board, queens
     
-def generate_boards_parallel(n: int, num_processes: int, num_boards: int) -> List[Tuple[np.ndarray, List[Tuple[int, int]]]]:
+def generate_boards_parallel(n: int, num_processes: int, num_boards: int,
+                             config: Optional[GeneratorConfig] = None
+                             ) -> List[Tuple[np.ndarray, List[Tuple[int, int]]]]:
     """Generate multiple boards in parallel"""
     with mp.Pool(processes=num_processes) as pool:
-        # Create partial function with fixed n
-        worker_func = partial(find_unique_solution_board_parallel, n)
+        # Create partial function with fixed n and config
+        worker_func = partial(find_unique_solution_board_parallel, n, config=config)
         
         # Generate process IDs
         process_ids = range(num_boards)
@@ -435,6 +478,103 @@ def generate_boards_parallel(n: int, num_processes: int, num_boards: int) -> Lis
         return [r for r in results if r is not None]
 
 
+def score_board_difficulty(board: np.ndarray) -> float:
+    """
+    Difficulty score of a finished board, log2 of the number of search nodes the
+    solver visits proving the solution is unique. Boards that need more guessing to
+    rule out alternative queen placements score higher.
+    """
+    return math.log2(count_search_nodes(board))
+
+
+def generate_scored_board(n: int, process_id: int = 0,
+                          config: Optional[GeneratorConfig] = None
+                          ) -> Tuple[float, str, np.ndarray, List[Tuple[int, int]]]:
+    """
+    Single process board generation for the top-k pipeline, returns the board with
+    its difficulty score and canonical hash
+    """
+    while True:
+        queens = generate_random_queens(n)
+        board = generate_regions_jagged(queens, n, config)
+
+        if board is not None:
+            return score_board_difficulty(board), get_board_hash(board), board, queens
+
+
+def generate_top_k_boards(n: int, num_processes: int, num_candidates: int,
+                          keep_top_k: int, min_difficulty: float = 0.0,
+                          board_index: Optional[BoardIndex] = None,
+                          config: Optional[GeneratorConfig] = None
+                          ) -> List[Tuple[np.ndarray, List[Tuple[int, int]], float, str]]:
+    """
+    Generate num_candidates boards in parallel and keep only the keep_top_k hardest
+    ones scoring at least min_difficulty, hardest first. Boards already in
+    board_index, or equivalent to another kept board, are skipped.
+
+    Workers generate and score boards, results are streamed back into a bounded
+    min-heap as they finish. Only a bounded number of tasks are in flight at once and
+    rejected boards are dropped immediately, so memory use doesn't grow with
+    num_candidates.
+    """
+    if keep_top_k < 1:
+        raise ValueError(f"keep_top_k must be at least 1, got {keep_top_k}")
+
+    max_in_flight = num_processes * 2
+    results = queue.Queue()
+    # Min-heap of (score, candidate_num, board_hash, board, queens), candidate_num
+    # breaks ties so boards are never compared
+    top_k = []
+    top_k_hashes = set()
+    num_duplicates = 0
+    start_time = time.time()
+
+    with mp.Pool(processes=num_processes) as pool:
+        worker_func = partial(generate_scored_board, n, config=config)
+        num_submitted = 0
+        num_in_flight = 0
+        num_finished = 0
+
+        while num_submitted < num_candidates or num_in_flight > 0:
+            while num_submitted < num_candidates and num_in_flight < max_in_flight:
+                pool.apply_async(worker_func, (num_submitted,),
+                                 callback=results.put, error_callback=results.put)
+                num_submitted += 1
+                num_in_flight += 1
+
+            result = results.get()
+            num_in_flight -= 1
+            if isinstance(result, BaseException):
+                raise result
+
+            score, board_hash, board, queens = result
+            num_finished += 1
+
+            is_duplicate = board_hash in top_k_hashes or \
+                (board_index is not None and board_index.contains_hash(board_hash))
+            if is_duplicate:
+                num_duplicates += 1
+            elif score >= min_difficulty:
+                item = (score, num_finished, board_hash, board, queens)
+                if len(top_k) < keep_top_k:
+                    heapq.heappush(top_k, item)
+                    top_k_hashes.add(board_hash)
+                elif score > top_k[0][0]:
+                    removed = heapq.heapreplace(top_k, item)
+                    top_k_hashes.discard(removed[2])
+                    top_k_hashes.add(board_hash)
+
+            if num_finished % 10 == 0:
+                elapsed = time.time() - start_time
+                cutoff = top_k[0][0] if len(top_k) == keep_top_k else min_difficulty
+                print(f"Scored {num_finished}/{num_candidates} candidates, "
+                      f"{elapsed / num_finished:.2f} sec/board, "
+                      f"current cutoff {cutoff:.2f}, {num_duplicates} duplicates")
+
+    return [(board, queens, score, board_hash)
+            for score, _, board_hash, board, queens in sorted(top_k, reverse=True)]
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--size', '-n', 
@@ -453,14 +593,54 @@ if __name__ == "__main__":
                         action="store_true",
                         help="Set flag to visualize finished board each iteration")
     parser.add_argument('--num_processes', type=int, default=1)
+    parser.add_argument('--min_difficulty',
+                        type=float,
+                        default=None,
+                        help="Only keep boards with at least this difficulty score, "
+                             "num_generations is then the number of candidates")
+    parser.add_argument('--keep_top_k',
+                        type=int,
+                        default=None,
+                        help="Only keep the k hardest of num_generations candidates")
+    parser.add_argument('--index_path',
+                        type=str,
+                        default=None,
+                        help="Board deduplication index, built from pregenerated_games "
+                             "and output_folder if missing. Duplicate candidates are "
+                             "skipped, needs --keep_top_k or --min_difficulty")
+    parser.add_argument('--temperature',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.temperature,
+                        help="Softmax temperature for picking the next square to color")
+    parser.add_argument('--banned_color_penalty',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.banned_color_penalty,
+                        help="Score added to squares next to a banned color square")
+    parser.add_argument('--same_color_weight',
+                        type=float,
+                        default=DEFAULT_GENERATOR_CONFIG.same_color_weight,
+                        help="Score subtracted per neighbor of the same color")
 
     args = parser.parse_args()
+    if args.index_path is not None and \
+            args.min_difficulty is None and args.keep_top_k is None:
+        parser.error("--index_path needs --keep_top_k or --min_difficulty")
+    if args.keep_top_k is not None and args.keep_top_k < 1:
+        parser.error("--keep_top_k must be at least 1")
+    if not args.temperature > 0:
+        parser.error("--temperature must be positive")
 
     n = args.size
     output_folder = args.output_folder
     num_generations = args.num_generations
     visualize_boards = args.visualize_boards
     num_processes = args.num_processes
+    min_difficulty = args.min_difficulty
+    keep_top_k = args.keep_top_k
+    index_path = args.index_path
+    config = GeneratorConfig(temperature=args.temperature,
+                             banned_color_penalty=args.banned_color_penalty,
+                             same_color_weight=args.same_color_weight)
 
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
@@ -477,11 +657,50 @@ if __name__ == "__main__":
     ending_num = starting_num + num_generations
     print(f"Generating {num_generations} boards from index {starting_num}")
 
-    if num_processes > 1:
+    if min_difficulty is not None or keep_top_k is not None:
+        start_time = time.time()
+
+        if keep_top_k is None:
+            keep_top_k = num_generations
+        if min_difficulty is None:
+            min_difficulty = 0.0
+
+        print(f"Using {num_processes} cores to keep the top {keep_top_k} of "
+              f"{num_generations} candidates with difficulty >= {min_difficulty}")
+        board_index = None
+        if index_path is not None:
+            board_index = load_board_index(index_path,
+                                           ["pregenerated_games", output_folder])
+            print(f"Loaded board index with {len(board_index)} boards")
+
+        boards = generate_top_k_boards(n, num_processes, num_generations, keep_top_k,
+                                       min_difficulty, board_index, config)
+
+        save_num = starting_num
+
+        for board, queens, score, board_hash in boards:
+            game_data = {"board": board, "queens": queens}
+            save_path = os.path.join(output_folder, f'board_num_{save_num}.pkl')
+            with open(save_path, 'wb') as f:
+                pickle.dump(game_data, f)
+
+            if board_index is not None:
+                board_index.add_hash(board_hash, save_path)
+
+            print(f"Saved board_num_{save_num} with difficulty {score:.2f}")
+            save_num += 1
+
+        if board_index is not None:
+            board_index.save()
+        print(f"Kept {len(boards)} of {num_generations} candidate boards")
+        elapsed_time = time.time() - start_time
+        print(f"Sec/candidate for {num_generations} candidates: "
+              f"{elapsed_time / num_generations}")
+    elif num_processes > 1:
         start_time = time.time()
 
         print(f"Using {num_processes} cores to generate boards")
-        boards = generate_boards_parallel(n, num_processes, num_generations)
+        boards = generate_boards_parallel(n, num_processes, num_generations, config)
         
         save_num = starting_num
 
@@ -504,7 +723,7 @@ if __name__ == "__main__":
                 elapsed_time = time.time() - start_time
                 print(f"Average sec per board {round(elapsed_time / (i - starting_num), 2)}")
 
-            board, queens = find_unique_solution_board(n)
+            board, queens = find_unique_solution_board(n, config=config)
 
             game_data = {"board": board, "queens": queens}
             with open(os.path.join(output_folder, f'board_num_{i}.pkl'), 'wb') as f:
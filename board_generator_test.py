@@ -1,4 +1,10 @@
-from board_generator import find_unique_solution_board
+import random
+import pytest
+import numpy as np
+
+from board_generator import (find_unique_solution_board, generate_top_k_boards,
+                             generate_random_queens, generate_regions_jagged,
+                             get_spindly_scores, GeneratorConfig)
 from get_solutions import find_up_to_two_solutions
 
 def test_small_board_generation():
@@ -14,3 +20,75 @@ def test_small_board_generation():
 def test_10_by_10_generation():
     board, _ = find_unique_solution_board(n=10, max_attempts=10)
     assert board is not None, f"Failed at finding 10 by 10 board"
+
+
+def test_top_k_generation():
+    boards = generate_top_k_boards(n=6, num_processes=2, num_candidates=6, keep_top_k=2)
+    scores = [score for _, _, score, _ in boards]
+
+    assert len(boards) == 2, "Expected exactly keep_top_k boards"
+    assert scores == sorted(scores, reverse=True), "Boards not sorted hardest first"
+    for board, _, _, _ in boards:
+        assert len(find_up_to_two_solutions(board)) == 1
+
+
+def test_top_k_min_difficulty():
+    # 10 candidates so the progress line reports the min_difficulty cutoff
+    boards = generate_top_k_boards(n=6, num_processes=2, num_candidates=10,
+                                   keep_top_k=10, min_difficulty=4.5)
+    assert all(score >= 4.5 for _, _, score, _ in boards)
+
+    boards = generate_top_k_boards(n=6, num_processes=2, num_candidates=10,
+                                   keep_top_k=10, min_difficulty=float('inf'))
+    assert boards == []
+
+    with pytest.raises(ValueError):
+        generate_top_k_boards(n=6, num_processes=2, num_candidates=6, keep_top_k=0)
+
+
+def test_generation_with_config():
+    config = GeneratorConfig(temperature=0.5, banned_color_penalty=-5,
+                             same_color_weight=1.0)
+    stats = {}
+    board = None
+    while board is None:
+        board = generate_regions_jagged(generate_random_queens(7), 7, config, stats)
+
+    assert len(find_up_to_two_solutions(board)) == 1
+    assert stats["uniqueness_checks"] > 0
+
+    for temperature in [0, -0.5, float('nan')]:
+        with pytest.raises(ValueError):
+            GeneratorConfig(temperature=temperature)
+
+
+def test_spindly_scores():
+    random.seed(0)
+    config = GeneratorConfig()
+    n = 7
+    for _ in range(50):
+        board = np.array([[random.randrange(n) if random.random() < 0.4 else -1
+                           for _ in range(n)] for _ in range(n)])
+        banned_colors = np.random.default_rng(random.randrange(1000)).random(
+            (n, n, n)) < 0.1
+        rows, cols, colors, scores = get_spindly_scores(board, banned_colors, config)
+
+        # Compare with scoring each (square, adjacent color) pair on its own
+        expected = {}
+        for row in range(n):
+            for col in range(n):
+                if board[row, col] != -1:
+                    continue
+                adjacent = [(row + dr, col + dc)
+                            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                            if 0 <= row + dr < n and 0 <= col + dc < n]
+                for color in set(board[r, c] for r, c in adjacent if board[r, c] != -1):
+                    same = sum(board[r, c] == color for r, c in adjacent)
+                    diff = sum(board[r, c] not in (-1, color) for r, c in adjacent)
+                    is_banned = any(banned_colors[r, c, color] for r, c in adjacent)
+                    expected[(row, col, color)] = diff - same * config.same_color_weight \
+                        + (config.banned_color_penalty if is_banned else 0)
+
+        actual = {(int(r), int(c), int(color)): float(score)
+                  for r, c, color, score in zip(rows, cols, colors, scores)}
+        assert actual == expected
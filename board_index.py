@@ -0,0 +1,140 @@
+import os
+import json
+import pickle
+import hashlib
+import argparse
+import numpy as np
+
+from typing import List, Optional, Dict
+from glob import glob
+
+
+def get_board_symmetries(board: np.ndarray) -> List[np.ndarray]:
+    """Get the 8 rotations and reflections of a board"""
+    symmetries = []
+    for transformed in [board, np.fliplr(board)]:
+        for k in range(4):
+            symmetries.append(np.rot90(transformed, k))
+    return symmetries
+
+
+def relabel_by_first_appearance(board: np.ndarray) -> np.ndarray:
+    """
+    Relabel region colors in order of first appearance scanning row by row, so the
+    first region seen is 0, the next new one is 1 and so on. Uncolored squares (-1)
+    are left as is.
+    """
+    flat = board.flatten()
+    colors, first_index = np.unique(flat[flat != -1], return_index=True)
+    color_order = colors[np.argsort(first_index)]
+
+    relabeled = np.full(flat.shape, -1)
+    for new_color, color in enumerate(color_order):
+        relabeled[flat == color] = new_color
+    return relabeled.reshape(board.shape)
+
+
+def canonicalize_board(board: np.ndarray) -> np.ndarray:
+    """
+    Canonical form of a board, the same for every rotation, reflection and color
+    relabeling of it. Picks the lexicographically smallest relabeled symmetry.
+    """
+    candidates = [relabel_by_first_appearance(b) for b in get_board_symmetries(board)]
+    return min(candidates, key=lambda b: b.flatten().tolist())
+
+
+def get_board_hash(board: np.ndarray) -> str:
+    """Hash of the canonical form of a board, equal for equivalent boards"""
+    canonical = canonicalize_board(np.asarray(board))
+    data = f"{canonical.shape[0]}:".encode() + canonical.astype(np.int8).tobytes()
+    return hashlib.sha1(data).hexdigest()
+
+
+class BoardIndex:
+    """
+    Set of canonical board hashes saved to disk as json, mapping each hash to the
+    first file found with that board. Duplicate checks are a set lookup.
+    """
+    def __init__(self, index_path: str = "board_index.json"):
+        self.index_path = index_path
+        self.hash_to_path: Dict[str, str] = {}
+
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.hash_to_path = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.hash_to_path)
+
+    def contains_hash(self, board_hash: str) -> bool:
+        return board_hash in self.hash_to_path
+
+    def contains(self, board: np.ndarray) -> bool:
+        return self.contains_hash(get_board_hash(board))
+
+    def add_hash(self, board_hash: str, path: str) -> bool:
+        """Add a board hash, returns False if it was already in the index"""
+        if board_hash in self.hash_to_path:
+            return False
+        self.hash_to_path[board_hash] = path
+        return True
+
+    def add(self, board: np.ndarray, path: str) -> bool:
+        return self.add_hash(get_board_hash(board), path)
+
+    def add_folder(self, folder: str) -> List[str]:
+        """Index every pickled board under a folder, returns paths of duplicates"""
+        duplicates = []
+        for path in sorted(glob(os.path.join(folder, "**", "*.pkl"), recursive=True)):
+            with open(path, 'rb') as f:
+                board = pickle.load(f)['board']
+            if not self.add(board, path):
+                duplicates.append(path)
+        return duplicates
+
+    def save(self) -> None:
+        with open(self.index_path, 'w') as f:
+            json.dump(self.hash_to_path, f, indent=1, sort_keys=True)
+
+
+def load_board_index(index_path: str, folders: Optional[List[str]] = None
+                     ) -> BoardIndex:
+    """Load the index at index_path, building it from folders if it doesn't exist"""
+    if os.path.exists(index_path):
+        return BoardIndex(index_path)
+
+    index = BoardIndex(index_path)
+    for folder in folders or []:
+        if os.path.exists(folder):
+            index.add_folder(folder)
+    index.save()
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the board deduplication index and report duplicates")
+    parser.add_argument('folders',
+                        nargs='*',
+                        default=["pregenerated_games", "output_folder"],
+                        help="Folders of pickled boards to index")
+    parser.add_argument('--index_path',
+                        type=str,
+                        default="board_index.json",
+                        help="Where to save the index")
+
+    args = parser.parse_args()
+
+    if os.path.exists(args.index_path):
+        os.remove(args.index_path)
+    board_index = BoardIndex(args.index_path)
+
+    for folder in args.folders:
+        if not os.path.exists(folder):
+            print(f"Skipping missing folder {folder}")
+            continue
+        for duplicate in board_index.add_folder(folder):
+            print(f"Duplicate board {duplicate}")
+
+    board_index.save()
+    print(f"Indexed {len(board_index)} unique boards to {args.index_path}")
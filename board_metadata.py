@@ -0,0 +1,120 @@
+import os
+import re
+import json
+import math
+import time
+import pickle
+import argparse
+import numpy as np
+import multiprocessing as mp
+
+from typing import Dict, List, Tuple
+
+from get_solutions import count_search_nodes
+from verify_corpus import get_board_content_hash
+from wire_format import encode_grid
+
+
+# Written into every board_size_<n> folder next to the games it describes
+METADATA_FILENAME = "metadata.json"
+
+
+def get_board_metadata(board: np.ndarray, queens: List[Tuple[int, int]]) -> Dict:
+    """
+    Summary of a board for game lists: region size stats, difficulty (log2 of the
+    solver's search nodes, as in score_board_difficulty) and the regions as a
+    thumbnail in the wire format
+    """
+    board = np.asarray(board)
+    region_sizes = np.bincount(board.flatten())
+    region_sizes = region_sizes[region_sizes > 0]
+    solver_nodes = count_search_nodes(board)
+
+    return {
+        "content_hash": get_board_content_hash(board, queens),
+        "size": int(board.shape[0]),
+        "region_sizes": {
+            "min": int(region_sizes.min()),
+            "max": int(region_sizes.max()),
+            "mean": round(float(region_sizes.mean()), 2),
+            "std": round(float(region_sizes.std()), 2),
+        },
+        "solver_nodes": int(solver_nodes),
+        "difficulty": round(math.log2(solver_nodes), 2),
+        "thumbnail": encode_grid(board),
+    }
+
+
+def get_game_numbers(size_dir: str) -> List[int]:
+    """Numbers of the <k>.pkl games in a board_size_<n> folder"""
+    return sorted(int(match.group(1)) for filename in os.listdir(size_dir)
+                  if (match := re.fullmatch(r'(\d+)\.pkl', filename)))
+
+
+def load_metadata_index(size_dir: str) -> Dict[int, Dict]:
+    """Metadata by game number for a board_size_<n> folder, empty if not built"""
+    path = os.path.join(size_dir, METADATA_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {int(game_number): metadata for game_number, metadata
+                in json.load(f).items()}
+
+
+def _get_game_metadata(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        game_data = pickle.load(f)
+    return get_board_metadata(game_data['board'], game_data['queens'])
+
+
+def build_metadata_index(size_dir: str, num_processes: int = 1) -> Dict[int, Dict]:
+    """
+    Write the metadata index of a board_size_<n> folder. Games whose content is
+    unchanged since the last build keep their metadata without being solved again.
+    """
+    old_metadata = load_metadata_index(size_dir)
+    metadata = {}
+    paths_to_build = {}
+
+    for game_number in get_game_numbers(size_dir):
+        path = os.path.join(size_dir, f"{game_number}.pkl")
+        previous = old_metadata.get(game_number)
+        if previous is not None:
+            with open(path, 'rb') as f:
+                game_data = pickle.load(f)
+            content_hash = get_board_content_hash(np.asarray(game_data['board']),
+                                                  game_data['queens'])
+            if content_hash == previous["content_hash"]:
+                metadata[game_number] = previous
+                continue
+        paths_to_build[game_number] = path
+
+    if paths_to_build:
+        with mp.Pool(processes=num_processes) as pool:
+            built = pool.map(_get_game_metadata, list(paths_to_build.values()))
+        metadata.update(zip(paths_to_build.keys(), built))
+
+    with open(os.path.join(size_dir, METADATA_FILENAME), 'w') as f:
+        json.dump({str(game_number): metadata[game_number]
+                   for game_number in sorted(metadata)}, f)
+    return metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the metadata index served with the game lists for every "
+                    "board_size_<n> folder")
+    parser.add_argument('--games_dir', type=str, default="pregenerated_games")
+    parser.add_argument('--num_processes', type=int, default=os.cpu_count())
+
+    args = parser.parse_args()
+
+    for dirname in sorted(os.listdir(args.games_dir)):
+        size_dir = os.path.join(args.games_dir, dirname)
+        if not re.fullmatch(r'board_size_(\d+)', dirname) or not os.path.isdir(size_dir):
+            continue
+
+        start_time = time.time()
+        metadata = build_metadata_index(size_dir, args.num_processes)
+        print(f"Built metadata for {len(metadata)} games in {size_dir} in "
+              f"{time.time() - start_time:.2f} seconds")
@@ -0,0 +1,128 @@
+import os
+import time
+import queue
+import random
+import secrets
+import threading
+import numpy as np
+import multiprocessing as mp
+
+from typing import List, Tuple, Optional
+
+from board_generator import (GeneratorConfig, generate_random_queens,
+                             generate_regions_jagged)
+from get_solutions import find_up_to_two_solutions_optimized
+
+
+# Id of the race workers should be working on, set per process by _init_worker.
+# Attempts for any other race stop at their next check.
+_current_race_id = None
+
+
+def _init_worker(current_race_id) -> None:
+    global _current_race_id
+    _current_race_id = current_race_id
+
+
+def _warm_up_worker(_) -> int:
+    """Run a tiny generation so the worker's imports and caches are loaded"""
+    board = None
+    while board is None:
+        board = generate_regions_jagged(generate_random_queens(5), 5)
+    find_up_to_two_solutions_optimized(board)
+    return os.getpid()
+
+
+def _race_attempt(n: int, race_id: int, seed: int, deadline: float,
+                  config: Optional[GeneratorConfig]
+                  ) -> Optional[Tuple[np.ndarray, List[Tuple[int, int]]]]:
+    """
+    Keep generating boards with its own seed until one is found, the race is won by
+    another attempt, or the deadline passes
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    while _current_race_id.value == race_id and time.time() < deadline:
+        queens = generate_random_queens(n)
+        board = generate_regions_jagged(queens, n, config)
+
+        if board is not None:
+            return board, queens
+
+    return None
+
+
+class BoardRacer:
+    """
+    Persistent pool of pre-forked workers for getting a single board fast. A race
+    starts several independently seeded attempts and returns the first board found,
+    the rest of the attempts are cancelled. Workers stay alive between races so
+    process startup and imports are only paid once.
+    """
+    def __init__(self, num_processes: Optional[int] = None,
+                 config: Optional[GeneratorConfig] = None):
+        self.num_processes = num_processes or os.cpu_count()
+        self.config = config
+        self.current_race_id = mp.Value('i', 0)
+        # Races share the workers, so only run one at a time
+        self.lock = threading.Lock()
+
+        self.pool = mp.Pool(processes=self.num_processes,
+                            initializer=_init_worker,
+                            initargs=(self.current_race_id,))
+        self.pool.map(_warm_up_worker, range(self.num_processes))
+
+    def race(self, n: int, timeout: float, num_attempts: Optional[int] = None
+             ) -> Optional[Tuple[np.ndarray, List[Tuple[int, int]]]]:
+        """
+        Race num_attempts seeded attempts (default one per worker) at generating an
+        nxn board. Returns the first board and queens found or None if none finished
+        within timeout seconds, time spent waiting for other races included.
+        """
+        if num_attempts is None:
+            num_attempts = self.num_processes
+
+        # Set before waiting for the lock so queued races don't get a fresh timeout
+        deadline = time.time() + timeout
+        if not self.lock.acquire(timeout=max(deadline - time.time(), 0)):
+            return None
+        try:
+            if time.time() >= deadline:
+                return None
+            with self.current_race_id.get_lock():
+                self.current_race_id.value += 1
+                race_id = self.current_race_id.value
+
+            results = queue.Queue()
+            for _ in range(num_attempts):
+                self.pool.apply_async(
+                    _race_attempt,
+                    (n, race_id, secrets.randbits(32), deadline, self.config),
+                    callback=results.put, error_callback=results.put)
+
+            winner = None
+            try:
+                for _ in range(num_attempts):
+                    result = results.get(timeout=max(deadline - time.time(), 0))
+                    if isinstance(result, BaseException):
+                        raise result
+                    if result is not None:
+                        winner = result
+                        break
+            except queue.Empty:
+                pass
+            finally:
+                # Cancel the attempts still running
+                with self.current_race_id.get_lock():
+                    self.current_race_id.value += 1
+
+            return winner
+        finally:
+            self.lock.release()
+
+    def close(self) -> None:
+        with self.current_race_id.get_lock():
+            self.current_race_id.value += 1
+        self.pool.terminate()
+        self.pool.join()
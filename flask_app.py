@@ -1,17 +1,52 @@
 from flask import Flask, send_from_directory, jsonify, request, redirect, session
+from flask.sessions import SecureCookieSessionInterface
 from flask_cors import CORS
 import numpy as np
 from board_generator import find_unique_solution_board
+from board_racer import BoardRacer
+from hints import get_hint, EMPTY, MARK_X, MARK_QUEEN
+from wire_format import encode_grid, decode_grid, get_regions_id, apply_mark_deltas
+from metrics import init_app as init_metrics, registry, span, profiler
+from board_metadata import load_metadata_index
+from static_export import DEFAULT_EXPORT_DIR, MANIFEST_FILENAME
 from typing import List, Set, Tuple, Optional
 import pickle
+import json
+import hashlib
 import os
+import re
 from datetime import timedelta
 import secrets
+import threading
+
+
+class TimedSessionInterface(SecureCookieSessionInterface):
+    """Cookie sessions with the cookie's signing and serialization timed as spans"""
+    def open_session(self, app, request):
+        with span("session_decode"):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with span("session_encode"):
+            super().save_session(app, session, response)
+
 
 app = Flask(__name__, static_url_path='/static')
+app.session_interface = TimedSessionInterface()
 CORS(app, supports_credentials=True)  # Enable credentials for session support
 app.secret_key = secrets.token_hex(16)  # Generate a secure secret key
 app.permanent_session_lifetime = timedelta(days=1)  # Set session lifetime
+init_metrics(app)  # Per-route latency histograms served at /api/metrics
+
+# The sampling profiler can only be switched on over the API when this is set
+PROFILER_TOGGLE_ENABLED = os.environ.get('QUEENS_PROFILER_TOGGLE') == '1'
+
+# Default time allowed for generating a new board when the request doesn't set one
+DEFAULT_LATENCY_TARGET_MS = 10000
+
+# Sizes generated on request, larger sizes are served from pregenerated games
+MIN_BOARD_SIZE = 6
+MAX_GENERATED_BOARD_SIZE = 11
 
 
 class GameState:
@@ -20,12 +55,28 @@ class GameState:
         self.queens = None
         self.regions = None
         self.marks = None
+        # Incremented on every change to marks so clients can sync mark deltas
+        self.version = 0
+
+    def initialize_from_generator(self, board_racer: Optional[BoardRacer] = None,
+                                  timeout: Optional[float] = None) -> bool:
+        """
+        Generate a new board, racing attempts across board_racer's workers if given.
+        Returns False if the race didn't find a board within timeout seconds.
+        """
+        with span("generation"):
+            if board_racer is None:
+                self.regions, self.queens = find_unique_solution_board(self.n)
+            else:
+                result = board_racer.race(self.n, timeout)
+                if result is None:
+                    return False
+                self.regions, self.queens = result
 
-    def initialize_from_generator(self):
-        self.regions, self.queens = find_unique_solution_board(self.n)
         print("regions:", self.regions)
         print("queens:", self.queens)
         self.marks = np.zeros((self.n, self.n), dtype=int)
+        return True
         
     def initialize_from_pickle(self, board_data: Tuple[np.ndarray, List[Tuple[int, int]]]):
         self.regions, self.queens = board_data
@@ -36,41 +87,132 @@ class GameState:
             'regions': self.regions.tolist() if self.regions is not None else None,
             'marks': self.marks.tolist() if self.marks is not None else None,
             'size': self.n,
+            'version': self.version,
+        }
+
+    def to_compact_dict(self):
+        """
+        Compact wire format, regions are only referenced by id since they never
+        change and are fetched once from /api/regions/<regions_id>
+        """
+        return {
+            'regions_id': get_regions_id(self.regions) if self.regions is not None else None,
+            'marks': encode_grid(self.marks) if self.marks is not None else None,
+            'size': self.n,
+            'version': self.version,
+        }
+
+    def to_session_dict(self):
+        """Compact form of the full state for storing in the session cookie"""
+        return {
+            'regions': encode_grid(self.regions) if self.regions is not None else None,
+            'marks': encode_grid(self.marks) if self.marks is not None else None,
+            'size': self.n,
+            'version': self.version,
         }
         
     def from_dict(self, data):
         self.n = data['size']
-        self.regions = np.array(data['regions']) if data['regions'] is not None else None
-        self.marks = np.array(data['marks']) if data['marks'] is not None else None
+        self.version = data.get('version', 0)
+        self.regions = self._grid_from_data(data['regions'])
+        self.marks = self._grid_from_data(data['marks'])
+
+    def _grid_from_data(self, grid_data) -> Optional[np.ndarray]:
+        """Grids are base64 strings in the session format and nested lists otherwise"""
+        if grid_data is None:
+            return None
+        if isinstance(grid_data, str):
+            return decode_grid(grid_data, self.n)
+        return np.array(grid_data)
 
     def reset_marks(self):
         """Reset all marks while preserving the board layout"""
         if self.marks is not None:
             self.marks = np.zeros((self.n, self.n), dtype=int)
+            self.version += 1
+
+    def apply_mark_deltas(self, deltas: List[Tuple[int, int]]) -> bool:
+        """Apply (cell, value) mark updates, returns False if any are invalid"""
+        if self.marks is None or not apply_mark_deltas(self.marks, deltas):
+            return False
+        self.version += 1
+        return True
 
 
 class GameStateManager:
     def __init__(self):
         self.games_dir = "pregenerated_games"
         self.available_games = self._load_available_games()
+        self.game_metadata = {size: load_metadata_index(
+                                  os.path.join(self.games_dir, f'board_size_{size}'))
+                              for size in self.available_games}
+        # Encoded /api/available_games/<size> responses and their etags by size
+        self.game_list_responses = {}
+        self.board_racer = None
+        self.board_racer_lock = threading.Lock()
+
+    def get_board_racer(self) -> BoardRacer:
+        """Get the worker pool for generating boards, starting it if needed"""
+        if self.board_racer is None:
+            # Threaded requests could otherwise each start a pool
+            with self.board_racer_lock:
+                if self.board_racer is None:
+                    self.board_racer = BoardRacer()
+        return self.board_racer
 
     def _load_available_games(self):
-        """Load available pre-generated games from organized subfolder structure"""
+        """
+        Load available pre-generated games from organized subfolder structure, every
+        board_size_<n> folder with games in it is an available size
+        """
         available = {}
-        for size in range(12, 16):
-            size_dir = os.path.join(self.games_dir, f"board_size_{size}")
-            available[size] = []
-            
-            if not os.path.exists(size_dir):
+        if not os.path.exists(self.games_dir):
+            return available
+
+        for dirname in os.listdir(self.games_dir):
+            match = re.fullmatch(r'board_size_(\d+)', dirname)
+            size_dir = os.path.join(self.games_dir, dirname)
+            if match is None or not os.path.isdir(size_dir):
                 continue
+
+            size = int(match.group(1))
+            available[size] = []
                 
             for filename in sorted(os.listdir(size_dir)):
                 if filename.endswith('.pkl'):
                     full_path = os.path.join(size_dir, filename)
                     available[size].append(full_path)
+
+            if not available[size]:
+                del available[size]
                     
         return available
 
+    def get_game_list_response(self, size: int) -> Tuple[bytes, str]:
+        """
+        Game numbers of a size with their metadata, encoded once since the games
+        don't change while the server runs
+        """
+        if size not in self.game_list_responses:
+            game_numbers = []
+            for path in self.available_games[size]:
+                try:
+                    game_num = int(os.path.basename(path).split('.')[0])
+                    game_numbers.append(game_num)
+                except ValueError:
+                    continue
+            game_numbers.sort()
+
+            metadata = self.game_metadata.get(size, {})
+            body = json.dumps({
+                'size': size,
+                'games': game_numbers,
+                'metadata': {str(game_num): metadata[game_num] for game_num
+                             in game_numbers if game_num in metadata},
+            }).encode()
+            self.game_list_responses[size] = (body, hashlib.sha1(body).hexdigest())
+        return self.game_list_responses[size]
+
     def get_game_state(self):
         """Get the current game state from session"""
         if 'game_state' not in session:
@@ -82,12 +224,18 @@ class GameStateManager:
 
     def save_game_state(self, game_state):
         """Save the current game state to session"""
-        session['game_state'] = game_state.to_dict()
+        session['game_state'] = game_state.to_session_dict()
 
-    def create_new_game(self, size: int) -> GameState:
-        """Create a new game of specified size"""
+    def create_new_game(self, size: int, latency_target_ms: int = DEFAULT_LATENCY_TARGET_MS
+                        ) -> Optional[GameState]:
+        """
+        Create a new game of specified size, returns None if no board could be
+        generated within the latency target
+        """
         game = GameState(size)
-        game.initialize_from_generator()
+        if not game.initialize_from_generator(self.get_board_racer(),
+                                              latency_target_ms / 1000):
+            return None
         self.save_game_state(game)
         return game
 
@@ -99,7 +247,7 @@ class GameStateManager:
             return None
             
         try:
-            with open(pickle_path, 'rb') as f:
+            with span("pickle_load"), open(pickle_path, 'rb') as f:
                 board_data = pickle.load(f)
                 
             game = GameState(size)
@@ -124,34 +272,48 @@ class GameStateManager:
 # Initialize the game state manager
 game_manager = GameStateManager()
 
+def game_response(game: GameState):
+    """Respond with the game in the compact format if the client asks for it"""
+    if request.args.get('format') == 'compact':
+        return jsonify(game.to_compact_dict())
+    return jsonify(game.to_dict())
+
 @app.route('/api/select_game/<int:size>/<int:game_number>')
 def select_specific_game(size, game_number):
-    if size < 12 or size > 15:
+    if size not in game_manager.available_games:
         return jsonify({'error': 'Invalid size'}), 400
         
     game = game_manager.load_specific_game(size, game_number)
     if game is None:
         return jsonify({'error': 'Game not found'}), 404
         
-    return jsonify(game.to_dict())
+    return game_response(game)
 
 @app.route('/api/new_game/<int:size>')
 def new_game(size):
-    if size < 6 or size > 15:
-        return jsonify({'error': 'Invalid size'}), 400
-        
-    if size >= 12:
+    if size in game_manager.available_games:
         return redirect(f'/select_game/{size}')
+
+    if size < MIN_BOARD_SIZE or size > MAX_GENERATED_BOARD_SIZE:
+        return jsonify({'error': 'Invalid size'}), 400
+
+    latency_target_ms = request.args.get('latency_ms', DEFAULT_LATENCY_TARGET_MS,
+                                         type=int)
+    if latency_target_ms <= 0:
+        return jsonify({'error': 'Invalid latency target'}), 400
+
+    game = game_manager.create_new_game(size, latency_target_ms)
+    if game is None:
+        return jsonify({'error': 'Timed out generating game'}), 503
         
-    game = game_manager.create_new_game(size)
-    return jsonify(game.to_dict())
+    return game_response(game)
 
 @app.route('/api/state')
 def get_state():
     game = game_manager.get_game_state()
     if game is None:
         return jsonify({'error': 'No game started'}), 400
-    return jsonify(game.to_dict())
+    return game_response(game)
 
 @app.route('/')
 def serve_landing():
@@ -163,33 +325,27 @@ def serve_game():
 
 @app.route('/select_game/<int:size>')
 def serve_game_selection(size):
-    if size < 12 or size > 15:
+    if size not in game_manager.available_games:
         return redirect('/')
     return send_from_directory('static', 'select_game.html')
 
+@app.route('/api/available_sizes')
+def get_available_sizes():
+    return jsonify({
+        'generated': list(range(MIN_BOARD_SIZE, MAX_GENERATED_BOARD_SIZE + 1)),
+        'pregenerated': sorted(game_manager.available_games.keys()),
+    })
+
 @app.route('/api/available_games/<int:size>')
 def get_available_games(size):
-    if size < 12 or size > 15:
+    if size not in game_manager.available_games:
         return jsonify({'error': 'Invalid size'}), 400
-        
-    size_dir = os.path.join('pregenerated_games', f'board_size_{size}')
-    if not os.path.exists(size_dir):
-        return jsonify({'size': size, 'games': []})
-        
-    game_numbers = []
-    for f in os.listdir(size_dir):
-        if f.endswith('.pkl'):
-            try:
-                game_num = int(f.split('.')[0])
-                game_numbers.append(game_num)
-            except ValueError:
-                continue
-    
-    game_numbers.sort()
-    return jsonify({
-        'size': size,
-        'games': game_numbers
-    })
+
+    body, etag = game_manager.get_game_list_response(size)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response.make_conditional(request)
 
 @app.route('/api/reset', methods=['POST'])
 def reset_game():
@@ -197,11 +353,107 @@ def reset_game():
     if game is None:
         return jsonify({'error': 'No game started'}), 400
         
-    return jsonify(game.to_dict())
+    return game_response(game)
+
+@app.route('/api/regions/<regions_id>')
+def get_regions(regions_id):
+    game = game_manager.get_game_state()
+    if game is None or game.regions is None or get_regions_id(game.regions) != regions_id:
+        return jsonify({'error': 'Regions not found'}), 404
+
+    response = jsonify({
+        'regions_id': regions_id,
+        'size': game.n,
+        'regions': encode_grid(game.regions),
+    })
+    # The id is derived from the content so the response never changes
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/api/marks', methods=['POST'])
+def update_marks():
+    game = game_manager.get_game_state()
+    if game is None:
+        return jsonify({'error': 'No game started'}), 400
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid mark update'}), 400
+    if data.get('version') != game.version:
+        # Client is out of sync, send the current state back to resync from
+        return jsonify(game.to_compact_dict()), 409
+
+    if not game.apply_mark_deltas(data.get('deltas', [])):
+        return jsonify({'error': 'Invalid mark update'}), 400
+
+    game_manager.save_game_state(game)
+    return jsonify({'version': game.version})
+
+@app.route('/api/hint', methods=['POST'])
+def hint():
+    game = game_manager.get_game_state()
+    if game is None:
+        return jsonify({'error': 'No game started'}), 400
+
+    # Marks are tracked by the client, so it sends its current marks along
+    data = request.get_json(silent=True) or {}
+    try:
+        marks = np.array(data['marks'], dtype=int) if 'marks' in data else game.marks
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid marks'}), 400
+    if marks.shape != (game.n, game.n) or \
+            not np.isin(marks, (EMPTY, MARK_X, MARK_QUEEN)).all():
+        return jsonify({'error': 'Invalid marks'}), 400
+
+    return jsonify(get_hint(game.regions, marks))
+
+@app.route('/api/metrics')
+def get_metrics():
+    return registry.render_prometheus(), 200, {
+        'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/api/profile', methods=['GET', 'POST'])
+def profile():
+    """
+    Report from the sampling profiler. POST {"enabled": bool, "reset": bool} turns
+    it on or off and clears its samples, if QUEENS_PROFILER_TOGGLE=1 is set.
+    """
+    if request.method == 'POST':
+        if not PROFILER_TOGGLE_ENABLED:
+            return jsonify({'error': 'Profiler toggle is disabled'}), 403
+
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            profiler.reset()
+        if data.get('enabled') is True:
+            profiler.start()
+        elif data.get('enabled') is False:
+            profiler.stop()
+
+    return jsonify(profiler.get_report(request.args.get('limit', 20, type=int)))
+
+@app.route('/static/games/<path:path>')
+def send_exported_game(path):
+    """
+    Games written by static_export.py. Any static file server can serve these with
+    the same headers, this route is for running without one.
+    """
+    response = send_from_directory(DEFAULT_EXPORT_DIR, path)
+    if path == MANIFEST_FILENAME:
+        # Revalidated with its etag so a new export is picked up
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        # Game files are named by their content so they never change
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @app.route('/static/<path:path>')
 def send_static(path):
     return send_from_directory('static', path)
 
 if __name__ == '__main__':
+    # Start the generation workers up front so the first game doesn't pay for it,
+    # only in the process that serves requests and not the debug reloader's parent
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        game_manager.get_board_racer()
     app.run(debug=True, host="0.0.0.0", port=5050)
\ No newline at end of file
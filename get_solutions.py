@@ -1,11 +1,15 @@
 import random
-from typing import List, Set, Tuple, Optional
+from typing import List, Set, Tuple, Optional, Dict, Iterator
 import matplotlib.pyplot as plt
 import numpy as np
 import time
 from collections import Counter
 import copy
 from collections import defaultdict
+from functools import lru_cache
+
+from solver_kernel import (NUMBA_AVAILABLE, MAX_KERNEL_BOARD_SIZE,
+                           find_up_to_two_solutions_kernel)
 
 def visualize_regions(board: np.ndarray):
     """Visualize the regions and queens"""
@@ -97,26 +101,24 @@ def find_up_to_two_solutions(board: np.ndarray) -> List[List[Tuple[int, int]]]:
     return solutions
 
 
-def find_up_to_two_solutions_optimized(board: np.ndarray
-                                       ) -> List[List[Tuple[int, int]]]:
-    """Optimized version of solution finder using better data structures and pruning."""
+def get_bitmask_search_data(board: np.ndarray
+                            ) -> Tuple[List[List[Tuple[int, int]]],
+                                       Dict[Tuple[int, int], int]]:
+    """
+    Pre-compute the data the bitmask solvers search over. Returns the cells of each
+    region, smallest region first for better pruning, and for each position a mask
+    of the cell and its neighbors with bit row * board_size + col set.
+    """
     board_size = len(board)
-    
-    # Pre-compute all region cells and sort by size (smaller regions first)
+
     region_to_cells = defaultdict(list)
     for i in range(board_size):
         for j in range(board_size):
             if board[i,j] != -1:  # Skip uncolored squares
                 region_to_cells[board[i,j]].append((i,j))
-    
-    # Sort regions by number of cells (ascending) for better pruning
+
     regions = sorted(region_to_cells.keys(), key=lambda r: len(region_to_cells[r]))
-    
-    # Use bit arrays for row and column tracking (much faster than sets)
-    used_rows = 0
-    used_cols = 0
-    
-    # Pre-compute adjacent cell masks for each position
+
     adjacent_masks = {}
     for i in range(board_size):
         for j in range(board_size):
@@ -128,68 +130,518 @@ def find_up_to_two_solutions_optimized(board: np.ndarray
                         mask |= 1 << (ni * board_size + nj)
             adjacent_masks[(i,j)] = mask
 
+    return [region_to_cells[r] for r in regions], adjacent_masks
+
+
+def find_up_to_two_solutions_optimized(board: np.ndarray
+                                       ) -> List[List[Tuple[int, int]]]:
+    """
+    Optimized version of solution finder using better data structures and pruning.
+    Runs the numba compiled kernel when numba is installed, otherwise the same
+    search in Python.
+    """
+    if NUMBA_AVAILABLE and len(board) <= MAX_KERNEL_BOARD_SIZE:
+        return find_up_to_two_solutions_jit(board)
+    return find_up_to_two_solutions_bitmask(board)
+
+
+def get_kernel_search_data(board: np.ndarray
+                           ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The search data of get_bitmask_search_data as flat int arrays for the solver
+    kernel: the rows and cols of every region's cells one region after another,
+    where each region starts in them, and for each column a mask of it and its
+    neighboring columns.
+    """
+    region_cells, _ = get_bitmask_search_data(board)
+    cells = [cell for cells in region_cells for cell in cells]
+    cell_rows = np.array([row for row, _ in cells], dtype=np.int64)
+    cell_cols = np.array([col for _, col in cells], dtype=np.int64)
+    region_starts = np.cumsum([0] + [len(cells) for cells in region_cells],
+                              dtype=np.int64)
+    neighbor_masks = np.array([(0b111 << col) >> 1 for col in range(len(board))],
+                              dtype=np.int64)
+    return cell_rows, cell_cols, region_starts, neighbor_masks
+
+
+def find_up_to_two_solutions_jit(board: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """
+    find_up_to_two_solutions_bitmask on the solver kernel, for boards up to
+    MAX_KERNEL_BOARD_SIZE. Without numba the kernel runs as (slow) plain Python.
+    """
+    cell_rows, cell_cols, region_starts, neighbor_masks = get_kernel_search_data(board)
+    solution_cells = np.zeros((2, len(region_starts) - 1), dtype=np.int64)
+    num_solutions = find_up_to_two_solutions_kernel(cell_rows, cell_cols, region_starts,
+                                                    neighbor_masks, len(board),
+                                                    solution_cells)
+    return [sorted((int(cell_rows[cell]), int(cell_cols[cell])) for cell in cells)
+            for cells in solution_cells[:num_solutions]]
+
+
+def find_up_to_two_solutions_bitmask(board: np.ndarray
+                                     ) -> List[List[Tuple[int, int]]]:
+    """
+    Bitmask search in Python for find_up_to_two_solutions_optimized.
+
+    Python ints are arbitrary width so the bitmasks work for any board size, and the
+    search uses an explicit stack instead of recursion so large boards don't pay for
+    deep Python call chains.
+    """
+    board_size = len(board)
+    
+    # Pre-compute region cells sorted by size (smaller regions first) and adjacent
+    # cell masks for each position
+    region_cells, adjacent_masks = get_bitmask_search_data(board)
+    num_regions = len(region_cells)
+    
+    # Use bit arrays for row and column tracking (much faster than sets)
+    used_rows = 0
+    used_cols = 0
+
     # Track placed queens using bit array
     placed_queens_mask = 0
     solutions = []
 
-    def is_valid_position(pos: Tuple[int, int]) -> bool:
-        """Check if a position is valid using bit operations."""
-        row, col = pos
-        if (used_rows & (1 << row)) or (used_cols & (1 << col)):
-            return False
-        
-        # Check if any adjacent square has a queen using pre-computed masks
-        if placed_queens_mask & adjacent_masks[pos]:
-            return False
-            
-        return True
+    # Stack state, the queen placed for each region so far and the index of the
+    # next cell to try in each region
+    placed_queens = []
+    next_cell_idx = [0] * (num_regions + 1)
+    region_idx = 0
 
-    def backtrack(region_idx: int) -> None:
-        """Backtracking with bit operations and early pruning."""
-        nonlocal used_rows, used_cols, placed_queens_mask
-        
+    while region_idx >= 0:
         # Found a solution
-        if region_idx == len(regions):
-            # Convert current state to queen positions
-            queen_positions = []
-            mask = placed_queens_mask
-            pos = 0
-            while mask:
-                if mask & 1:
-                    queen_positions.append((pos // board_size, pos % board_size))
-                mask >>= 1
-                pos += 1
-            solutions.append(sorted(queen_positions))
-            return
-            
-        # Stop if we found two solutions
-        if len(solutions) >= 2:
-            return
-            
-        # Try each possible position in current region
-        region = regions[region_idx]
-        for pos in region_to_cells[region]:
-            row, col = pos
-            if is_valid_position(pos):
-                # Update state using bit operations
+        if region_idx == num_regions:
+            solutions.append(sorted(placed_queens))
+            # Stop if we found two solutions
+            if len(solutions) >= 2:
+                break
+            advanced = False
+        else:
+            # Try the remaining positions in current region
+            cells = region_cells[region_idx]
+            cell_idx = next_cell_idx[region_idx]
+            advanced = False
+
+            while cell_idx < len(cells):
+                row, col = cells[cell_idx]
+                cell_idx += 1
+
+                if (used_rows & (1 << row)) or (used_cols & (1 << col)):
+                    continue
+                # Check if any adjacent square has a queen using pre-computed masks
+                if placed_queens_mask & adjacent_masks[(row, col)]:
+                    continue
+
+                # Update state using bit operations and descend
+                next_cell_idx[region_idx] = cell_idx
                 used_rows |= (1 << row)
                 used_cols |= (1 << col)
                 placed_queens_mask |= (1 << (row * board_size + col))
-                
-                backtrack(region_idx + 1)
-                
-                # Revert state
+                placed_queens.append((row, col))
+
+                region_idx += 1
+                next_cell_idx[region_idx] = 0
+                advanced = True
+                break
+
+        if not advanced:
+            # Region exhausted, backtrack and revert the previous region's queen
+            region_idx -= 1
+            if region_idx >= 0:
+                row, col = placed_queens.pop()
                 used_rows &= ~(1 << row)
                 used_cols &= ~(1 << col)
                 placed_queens_mask &= ~(1 << (row * board_size + col))
-                
-                # Early exit if we found two solutions
-                if len(solutions) >= 2:
-                    return
 
-    backtrack(0)
     return solutions
 
+
+@lru_cache(maxsize=None)
+def get_attack_masks(board_size: int) -> Tuple[int, ...]:
+    """
+    For each square, with bit row * board_size + col, a mask of the squares a queen
+    there rules out: its row, column, neighbors and the square itself
+    """
+    attack_masks = []
+    for i in range(board_size):
+        for j in range(board_size):
+            mask = 0
+            for k in range(board_size):
+                mask |= 1 << (i * board_size + k)
+                mask |= 1 << (k * board_size + j)
+            for di in [-1, 0, 1]:
+                for dj in [-1, 0, 1]:
+                    ni, nj = i + di, j + dj
+                    if 0 <= ni < board_size and 0 <= nj < board_size:
+                        mask |= 1 << (ni * board_size + nj)
+            attack_masks.append(mask)
+    return tuple(attack_masks)
+
+
+def _has_any_solution(region_masks: List[int], blocked: int,
+                      attack_masks: Tuple[int, ...]) -> bool:
+    """
+    Check if every region in region_masks can get a queen on a square not in
+    blocked. Branches on the region with the fewest open squares and fails as soon
+    as any region has none left.
+    """
+    if not region_masks:
+        return True
+
+    best_idx = -1
+    best_open = 0
+    best_count = 0
+    for idx, region_mask in enumerate(region_masks):
+        open_squares = region_mask & ~blocked
+        if not open_squares:
+            return False
+        count = open_squares.bit_count()
+        if best_idx == -1 or count < best_count:
+            best_idx, best_open, best_count = idx, open_squares, count
+
+    other_regions = region_masks[:best_idx] + region_masks[best_idx + 1:]
+    while best_open:
+        square = best_open & -best_open
+        if _has_any_solution(other_regions, blocked | attack_masks[square.bit_length() - 1],
+                             attack_masks):
+            return True
+        best_open ^= square
+    return False
+
+
+def has_solution_with_queen(board: np.ndarray, queen: Tuple[int, int]) -> bool:
+    """
+    Check if any solution has a queen at the given position, for that square's
+    region. The generator only ever adds a square to a region of a board with a
+    unique solution, so any new solution has to put that region's queen on the new
+    square. Checking for that is a much smaller search than re-solving the board.
+    """
+    board_size = len(board)
+    row, col = queen
+    queen_region = board[row, col]
+    attack_masks = get_attack_masks(board_size)
+
+    region_to_mask = defaultdict(int)
+    for pos, color in enumerate(board.flatten().tolist()):
+        if color != -1 and color != queen_region:
+            region_to_mask[color] |= 1 << pos
+
+    return _has_any_solution(list(region_to_mask.values()),
+                             attack_masks[row * board_size + col], attack_masks)
+
+
+def has_other_solution(board: np.ndarray, solution: List[Tuple[int, int]]) -> bool:
+    """
+    Check if a board has any solution other than the given one. Any other solution
+    first differs from it at some region, so for each region in turn this searches
+    with the earlier regions' queens fixed and this region's queen square excluded.
+    Knowing one solution makes this much faster than solving from scratch.
+    """
+    board_size = len(board)
+    attack_masks = get_attack_masks(board_size)
+
+    region_to_mask = defaultdict(int)
+    for pos, color in enumerate(board.flatten().tolist()):
+        if color != -1:
+            region_to_mask[color] |= 1 << pos
+    queen_squares = {int(board[row, col]): row * board_size + col for row, col in solution}
+
+    regions = list(region_to_mask.keys())
+    blocked = 0
+    for idx, region in enumerate(regions):
+        square = queen_squares[region]
+        other_region_masks = [region_to_mask[r] for r in regions[idx + 1:]]
+        if _has_any_solution([region_to_mask[region] & ~(1 << square)] + other_region_masks,
+                             blocked, attack_masks):
+            return True
+        blocked |= attack_masks[square]
+    return False
+
+
+def count_search_nodes(board: np.ndarray) -> int:
+    """
+    Count the search nodes visited by the optimized solver while proving whether
+    the board has one or more solutions. Used as a proxy for board difficulty, boards
+    that need a lot of guessing to rule out alternatives visit more nodes.
+    """
+    board_size = len(board)
+    region_cells, adjacent_masks = get_bitmask_search_data(board)
+
+    num_nodes = 0
+    num_solutions = 0
+
+    def backtrack(region_idx: int, used_rows: int, used_cols: int,
+                  placed_queens_mask: int) -> None:
+        nonlocal num_nodes, num_solutions
+        num_nodes += 1
+
+        if region_idx == len(region_cells):
+            num_solutions += 1
+            return
+
+        for row, col in region_cells[region_idx]:
+            if (used_rows & (1 << row)) or (used_cols & (1 << col)):
+                continue
+            if placed_queens_mask & adjacent_masks[(row, col)]:
+                continue
+
+            backtrack(region_idx + 1,
+                      used_rows | (1 << row),
+                      used_cols | (1 << col),
+                      placed_queens_mask | (1 << (row * board_size + col)))
+
+            if num_solutions >= 2:
+                return
+
+    backtrack(0, 0, 0, 0)
+    return num_nodes
+
+
+def iter_solutions(board: np.ndarray, limit: Optional[int] = None
+                   ) -> Iterator[List[Tuple[int, int]]]:
+    """
+    Lazily yield solutions, each as sorted queen positions, stopping after limit
+    solutions if given. Solutions are found one at a time so enumerating can be
+    stopped early without searching the rest of the board.
+    """
+    board_size = len(board)
+    region_cells, adjacent_masks = get_bitmask_search_data(board)
+    num_yielded = 0
+
+    def backtrack(region_idx: int, used_rows: int, used_cols: int,
+                  placed_queens: List[Tuple[int, int]],
+                  placed_queens_mask: int) -> Iterator[List[Tuple[int, int]]]:
+        if region_idx == len(region_cells):
+            yield sorted(placed_queens)
+            return
+
+        for row, col in region_cells[region_idx]:
+            if (used_rows & (1 << row)) or (used_cols & (1 << col)):
+                continue
+            if placed_queens_mask & adjacent_masks[(row, col)]:
+                continue
+
+            placed_queens.append((row, col))
+            yield from backtrack(region_idx + 1,
+                                 used_rows | (1 << row),
+                                 used_cols | (1 << col),
+                                 placed_queens,
+                                 placed_queens_mask | (1 << (row * board_size + col)))
+            placed_queens.pop()
+
+    if limit is not None and limit <= 0:
+        return
+
+    for solution in backtrack(0, 0, 0, [], 0):
+        yield solution
+        num_yielded += 1
+        if limit is not None and num_yielded >= limit:
+            return
+
+
+def count_solutions(board: np.ndarray, cap: Optional[int] = None) -> int:
+    """
+    Count solutions without building them, stopping once cap solutions are found.
+    The result is exact when it is below cap.
+    """
+    board_size = len(board)
+    region_cells, adjacent_masks = get_bitmask_search_data(board)
+    num_solutions = 0
+
+    def backtrack(region_idx: int, used_rows: int, used_cols: int,
+                  placed_queens_mask: int) -> None:
+        nonlocal num_solutions
+
+        if region_idx == len(region_cells):
+            num_solutions += 1
+            return
+
+        for row, col in region_cells[region_idx]:
+            if (used_rows & (1 << row)) or (used_cols & (1 << col)):
+                continue
+            if placed_queens_mask & adjacent_masks[(row, col)]:
+                continue
+
+            backtrack(region_idx + 1,
+                      used_rows | (1 << row),
+                      used_cols | (1 << col),
+                      placed_queens_mask | (1 << (row * board_size + col)))
+
+            if cap is not None and num_solutions >= cap:
+                return
+
+    if cap is None or cap > 0:
+        backtrack(0, 0, 0, 0)
+    return num_solutions
+
+
+def find_row_bands(board: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Split the rows into bands, as (start, end) row ranges, that no region crosses.
+    Every queen of a band's regions is in the band, so bands only interact through
+    the columns they use and the rows on either side of each boundary.
+    """
+    board_size = len(board)
+    region_to_rows = {}
+    for i in range(board_size):
+        for j in range(board_size):
+            first_row, _ = region_to_rows.get(board[i, j], (i, i))
+            region_to_rows[board[i, j]] = (first_row, i)
+
+    # Row i starts a new band unless some region has squares in rows i - 1 and i
+    is_crossed = [False] * board_size
+    for first_row, last_row in region_to_rows.values():
+        for i in range(first_row + 1, last_row + 1):
+            is_crossed[i] = True
+
+    band_starts = [i for i in range(board_size) if not is_crossed[i]]
+    return list(zip(band_starts, band_starts[1:] + [board_size]))
+
+
+def _iter_band_placements(region_cells: List[List[Tuple[int, int]]],
+                          adjacent_masks: Dict[Tuple[int, int], int],
+                          board_size: int, used_cols: int, placed_queens_mask: int
+                          ) -> Iterator[Tuple[int, int, List[Tuple[int, int]]]]:
+    """
+    Yield every placement of a band's regions given the columns already used and
+    the queens already placed next to the band, with the columns and queens mask
+    after it
+    """
+    def backtrack(region_idx: int, used_rows: int, used_cols: int,
+                  placed_queens: List[Tuple[int, int]], placed_queens_mask: int
+                  ) -> Iterator[Tuple[int, int, List[Tuple[int, int]]]]:
+        if region_idx == len(region_cells):
+            yield used_cols, placed_queens_mask, list(placed_queens)
+            return
+
+        for row, col in region_cells[region_idx]:
+            if (used_rows & (1 << row)) or (used_cols & (1 << col)):
+                continue
+            if placed_queens_mask & adjacent_masks[(row, col)]:
+                continue
+
+            placed_queens.append((row, col))
+            yield from backtrack(region_idx + 1,
+                                 used_rows | (1 << row),
+                                 used_cols | (1 << col),
+                                 placed_queens,
+                                 placed_queens_mask | (1 << (row * board_size + col)))
+            placed_queens.pop()
+
+    yield from backtrack(0, 0, used_cols, [], placed_queens_mask)
+
+
+def _find_up_to_two_band_solutions(board: np.ndarray, bands: List[Tuple[int, int]]
+                                   ) -> List[List[Tuple[int, int]]]:
+    """
+    Solve one band at a time, the band with the smallest region first like the
+    plain search. What's left to solve only depends on the columns used so far and
+    the queens in rows bordering the bands still to solve, so each of those
+    sub-problems is solved once however many placements lead to it.
+    """
+    board_size = len(board)
+    _, adjacent_masks = get_bitmask_search_data(board)
+
+    band_region_cells = []
+    for start, end in bands:
+        region_to_cells = defaultdict(list)
+        for i in range(start, end):
+            for j in range(board_size):
+                region_to_cells[board[i, j]].append((i, j))
+        # A queen per row means a band needs as many regions as rows
+        if len(region_to_cells) != end - start:
+            return []
+        band_region_cells.append(sorted(region_to_cells.values(), key=len))
+
+    band_order = sorted(range(len(bands)), key=lambda b: len(band_region_cells[b][0]))
+    row_mask = (1 << board_size) - 1
+
+    # Squares of the rows that border a band still to solve, by step. Queens
+    # anywhere else can't affect the remaining bands.
+    border_masks = []
+    for step in range(len(bands)):
+        border_mask = 0
+        for band_idx in band_order[step:]:
+            start, end = bands[band_idx]
+            for row in [start - 1, end]:
+                if 0 <= row < board_size:
+                    border_mask |= row_mask << (row * board_size)
+        border_masks.append(border_mask)
+
+    # Columns of every region still to solve by step, for skipping states where
+    # some regions have fewer free columns between them than there are regions
+    remaining_col_masks = []
+    for step in range(len(bands)):
+        remaining_col_masks.append([sum(1 << col for col in set(c for _, c in cells))
+                                    for band_idx in band_order[step:]
+                                    for cells in band_region_cells[band_idx]])
+
+    # (step, columns used, queens bordering the bands left) -> up to two solutions
+    # for the bands left
+    memo = {}
+
+    def solve(step: int, used_cols: int, placed_queens_mask: int
+              ) -> List[List[Tuple[int, int]]]:
+        if step == len(bands):
+            return [[]]
+        placed_queens_mask &= border_masks[step]
+        if (step, used_cols, placed_queens_mask) in memo:
+            return memo[(step, used_cols, placed_queens_mask)]
+        free_col_masks = set()
+        for mask in remaining_col_masks[step]:
+            free_col_masks.add(mask & ~used_cols)
+        if 0 in free_col_masks:
+            return []
+        for cols in free_col_masks:
+            num_confined = sum(1 for mask in remaining_col_masks[step]
+                               if mask & ~used_cols & ~cols == 0)
+            if num_confined > cols.bit_count():
+                return []
+
+        solutions = []
+        for band_used_cols, band_queens_mask, placement in _iter_band_placements(
+                band_region_cells[band_order[step]], adjacent_masks, board_size,
+                used_cols, placed_queens_mask):
+            for rest in solve(step + 1, band_used_cols, band_queens_mask):
+                solutions.append(placement + rest)
+                if len(solutions) >= 2:
+                    break
+            if len(solutions) >= 2:
+                break
+
+        memo[(step, used_cols, placed_queens_mask)] = solutions
+        return solutions
+
+    return [sorted(solution) for solution in solve(0, 0, 0)]
+
+
+def find_up_to_two_solutions_banded(board: np.ndarray
+                                    ) -> List[List[Tuple[int, int]]]:
+    """
+    Same results as find_up_to_two_solutions_optimized, but boards whose regions
+    split into row (or column) bands are solved band by band, so the cost is about
+    the sum of the bands' costs instead of exponential in the whole board. Boards
+    with uncolored squares, without a region per row or that don't split fall back
+    on the plain search.
+    """
+    board = np.asarray(board)
+    # Bands rely on every row having a queen, which needs a region per row
+    if (board == -1).any() or len(np.unique(board)) != len(board):
+        return find_up_to_two_solutions_optimized(board)
+
+    row_bands = find_row_bands(board)
+    col_bands = find_row_bands(board.T)
+    if max(len(row_bands), len(col_bands)) == 1:
+        return find_up_to_two_solutions_optimized(board)
+
+    if len(row_bands) >= len(col_bands):
+        return _find_up_to_two_band_solutions(board, row_bands)
+
+    # Solve the transposed board and transpose the queens back
+    solutions = _find_up_to_two_band_solutions(board.T, col_bands)
+    return [sorted((col, row) for row, col in solution) for solution in solutions]
+
+
 if __name__ == "__main__":
 
     board_12_x_12 = np.array([
@@ -0,0 +1,223 @@
+import hashlib
+import threading
+import numpy as np
+
+from typing import List, Tuple, Optional, Dict
+from functools import lru_cache
+from itertools import combinations
+from collections import OrderedDict
+
+from get_solutions import find_up_to_two_solutions_optimized
+
+
+# Mark values used by the client and GameState.marks
+EMPTY = 0
+MARK_X = 1
+MARK_QUEEN = 2
+
+# Names of the region colors in the order static/game.html draws them
+REGION_COLOR_NAMES = [
+    "red", "lime", "cornflower blue", "gold", "magenta", "cyan", "tangerine",
+    "brown", "dodger blue", "green", "pink", "purple", "sky blue", "orange red",
+    "dark olive", "plum", "khaki", "sea green", "indian red", "steel blue",
+    "yellow green", "tan", "hot pink", "olive", "slate blue",
+]
+
+# Largest group of regions checked for being confined to the same rows/columns
+MAX_CONFINED_GROUP_SIZE = 3
+
+# Hints kept for repeated positions, keys are 16 byte digests so even 25x25 boards
+# only take a few MB when the cache is full
+HINT_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=1024)
+def _get_solution(regions_bytes: bytes, n: int) -> Optional[Tuple[Tuple[int, int], ...]]:
+    """Solve a board once per layout, None if it doesn't have a unique solution"""
+    regions = np.frombuffer(regions_bytes, dtype=np.int64).reshape(n, n)
+    solutions = find_up_to_two_solutions_optimized(regions)
+    if len(solutions) != 1:
+        return None
+    return tuple((int(r), int(c)) for r, c in solutions[0])
+
+
+def _get_region_name(color: int) -> str:
+    if 0 <= color < len(REGION_COLOR_NAMES):
+        return f"the {REGION_COLOR_NAMES[color]} region"
+    return f"region {color + 1}"
+
+
+def _make_hint(action: str, cell: Tuple[int, int], reason: str) -> Dict:
+    return {'action': action, 'cell': [int(cell[0]), int(cell[1])], 'reason': reason}
+
+
+def _get_units(regions: np.ndarray) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    """Every row, column and region as (description, cells)"""
+    n = regions.shape[0]
+    units = []
+    for i in range(n):
+        units.append((f"row {i + 1}", [(i, j) for j in range(n)]))
+    for j in range(n):
+        units.append((f"column {j + 1}", [(i, j) for i in range(n)]))
+    for color in sorted(set(regions.flatten().tolist())):
+        cells = [(int(r), int(c)) for r, c in zip(*np.where(regions == color))]
+        units.append((_get_region_name(int(color)), cells))
+    return units
+
+
+def _get_attacked_cells(regions: np.ndarray, queen: Tuple[int, int]
+                        ) -> List[Tuple[Tuple[int, int], str]]:
+    """Cells a queen rules out, each with the reason they're ruled out"""
+    n = regions.shape[0]
+    row, col = queen
+    attacked = []
+    for i in range(n):
+        for j in range(n):
+            if (i, j) == queen:
+                continue
+            if abs(i - row) <= 1 and abs(j - col) <= 1:
+                attacked.append(((i, j), "Queens can't touch, even diagonally"))
+            elif i == row:
+                attacked.append(((i, j), f"Row {row + 1} already has a queen"))
+            elif j == col:
+                attacked.append(((i, j), f"Column {col + 1} already has a queen"))
+            elif regions[i, j] == regions[row, col]:
+                region_name = _get_region_name(int(regions[row, col]))
+                attacked.append(((i, j), f"{region_name.capitalize()} already has a queen"))
+    return attacked
+
+
+def _compute_hint(regions: np.ndarray, marks: np.ndarray) -> Dict:
+    """
+    Find the next logical step from the player's marks. Rules are tried simplest
+    first, the first cell a rule can decide is returned with the reason.
+    """
+    n = regions.shape[0]
+    solution = _get_solution(regions.astype(np.int64).tobytes(), n)
+    if solution is None:
+        return {'action': 'none', 'reason': "This board doesn't have a unique solution"}
+    solution_cells = set(solution)
+
+    # Wrong marks make any further deduction meaningless, so point them out first
+    for i in range(n):
+        for j in range(n):
+            if marks[i, j] == MARK_X and (i, j) in solution_cells:
+                return _make_hint('mistake', (i, j), "A queen belongs on this square")
+            if marks[i, j] == MARK_QUEEN and (i, j) not in solution_cells:
+                return _make_hint('mistake', (i, j), "A queen can't go on this square")
+
+    queens = [(i, j) for i in range(n) for j in range(n) if marks[i, j] == MARK_QUEEN]
+    if len(queens) == n:
+        return {'action': 'solved', 'reason': "All queens are placed"}
+
+    # Squares that could still hold a queen
+    open_cells = set((i, j) for i in range(n) for j in range(n)
+                     if marks[i, j] == EMPTY)
+
+    # 1. Squares ruled out by a placed queen
+    for queen in queens:
+        for cell, reason in _get_attacked_cells(regions, queen):
+            if cell in open_cells:
+                return _make_hint('eliminate', cell, reason)
+
+    units = _get_units(regions)
+    queen_set = set(queens)
+
+    # 2. A row, column or region with one square left must hold the queen
+    for description, cells in units:
+        if any(cell in queen_set for cell in cells):
+            continue
+        remaining = [cell for cell in cells if cell in open_cells]
+        if len(remaining) == 1:
+            return _make_hint('place', remaining[0],
+                              f"Only square left for the queen of {description}")
+
+    # 3. Groups of k regions whose open squares fit in k rows (or columns) use up
+    #    those rows, so no other region can have its queen there
+    region_cells = {}
+    for description, cells in units[2 * n:]:
+        color = regions[cells[0]]
+        if not any(cell in queen_set for cell in cells):
+            region_cells[color] = [cell for cell in cells if cell in open_cells]
+
+    for axis, axis_name in [(0, "row"), (1, "column")]:
+        for group_size in range(1, MAX_CONFINED_GROUP_SIZE + 1):
+            for group in combinations(region_cells.keys(), group_size):
+                lines = set(cell[axis] for color in group
+                            for cell in region_cells[color])
+                if len(lines) != group_size:
+                    continue
+                for cell in sorted(open_cells):
+                    if cell[axis] in lines and regions[cell] not in group:
+                        line_names = ", ".join(str(line + 1) for line in sorted(lines))
+                        plural = "s" if group_size > 1 else ""
+                        return _make_hint(
+                            'eliminate', cell,
+                            f"{group_size} region{plural} must use {axis_name}{plural} "
+                            f"{line_names}, so no other region can have a queen there")
+
+    # 4. A square whose queen would leave some row, column or region with no room
+    for cell in sorted(open_cells):
+        attacked = set(c for c, _ in _get_attacked_cells(regions, cell))
+        for description, cells in units:
+            if cell in cells or any(c in queen_set for c in cells):
+                continue
+            if all(c not in open_cells or c in attacked for c in cells):
+                return _make_hint('eliminate', cell,
+                                  f"A queen here would leave no room in {description}")
+
+    # Nothing simple applies, fall back on the solution
+    for cell in sorted(open_cells):
+        if cell not in solution_cells:
+            return _make_hint('eliminate', cell,
+                              "Trying a queen here eventually leads to a contradiction")
+    for cell in sorted(open_cells):
+        return _make_hint('place', cell, "Every other option leads to a contradiction")
+
+    return {'action': 'none', 'reason': "No hint available"}
+
+
+class _HintCache:
+    """Least recently used hints by digest of the board and marks"""
+    def __init__(self, maxsize: int = HINT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hints: OrderedDict = OrderedDict()
+        # Flask may serve requests from several threads
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(regions: np.ndarray, marks: np.ndarray) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(bytes([regions.shape[0]]))
+        digest.update(np.ascontiguousarray(regions, dtype=np.uint8).tobytes())
+        digest.update(np.ascontiguousarray(marks, dtype=np.uint8).tobytes())
+        return digest.digest()
+
+    def get_hint(self, regions: np.ndarray, marks: np.ndarray) -> Dict:
+        key = self.get_key(regions, marks)
+        with self.lock:
+            if key in self.hints:
+                self.hints.move_to_end(key)
+                return self.hints[key]
+
+        hint = _compute_hint(np.asarray(regions, dtype=np.int64),
+                             np.asarray(marks, dtype=np.int64))
+        with self.lock:
+            self.hints[key] = hint
+            if len(self.hints) > self.maxsize:
+                self.hints.popitem(last=False)
+        return hint
+
+
+_hint_cache = _HintCache()
+
+
+def get_hint(regions: np.ndarray, marks: np.ndarray) -> Dict:
+    """
+    Get the next forced elimination or queen placement for a board given the
+    player's marks (0 = empty, 1 = X, 2 = queen). Returns a dict with 'action'
+    ('eliminate', 'place', 'mistake', 'solved' or 'none'), the 'cell' it applies to
+    and a 'reason'. Hints are cached by board and marks, so repeated positions on
+    popular boards are answered without recomputing.
+    """
+    return dict(_hint_cache.get_hint(regions, marks))
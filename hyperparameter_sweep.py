@@ -0,0 +1,141 @@
+import random
+import time
+import json
+import argparse
+import itertools
+import numpy as np
+import multiprocessing as mp
+
+from typing import List, Tuple, Dict
+from collections import defaultdict
+
+from board_generator import (GeneratorConfig, DEFAULT_GENERATOR_CONFIG,
+                             generate_random_queens, generate_regions_jagged)
+
+
+def run_sweep_trial(n: int, config: GeneratorConfig, seed: int
+                    ) -> Tuple[GeneratorConfig, float, int, int, int]:
+    """
+    Generate one unique solution board with the given config, returns the config
+    with seconds taken, number of attempts, number of uniqueness checks and number
+    of checks skipped by the pre-checks and symmetry bans
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    stats = {"uniqueness_checks": 0, "precheck_accepts": 0, "banned_rejects": 0}
+    start_time = time.time()
+    num_attempts = 0
+
+    while True:
+        num_attempts += 1
+        queens = generate_random_queens(n)
+        board = generate_regions_jagged(queens, n, config, stats)
+        if board is not None:
+            break
+
+    elapsed = time.time() - start_time
+    return (config, elapsed, num_attempts, stats["uniqueness_checks"],
+            stats["precheck_accepts"] + stats["banned_rejects"])
+
+
+def _run_sweep_trial_star(args):
+    return run_sweep_trial(*args)
+
+
+def run_sweep(n: int, configs: List[GeneratorConfig], boards_per_setting: int,
+              num_processes: int) -> List[Dict]:
+    """
+    Time generating boards_per_setting boards for every config in parallel. Each
+    config is run with the same seeds so settings are compared on the same queens.
+    Returns one result per config sorted by seconds per board, fastest first.
+    """
+    trials = [(n, config, seed) for config in configs
+              for seed in range(boards_per_setting)]
+    config_to_trials = defaultdict(list)
+
+    with mp.Pool(processes=num_processes) as pool:
+        for num_done, (config, elapsed, num_attempts, num_checks,
+                       num_skipped) in enumerate(
+                pool.imap_unordered(_run_sweep_trial_star, trials)):
+            config_to_trials[config].append((elapsed, num_attempts, num_checks,
+                                             num_skipped))
+
+            if (num_done + 1) % 10 == 0:
+                print(f"Finished {num_done + 1}/{len(trials)} trials")
+
+    results = []
+    for config, config_trials in config_to_trials.items():
+        total_time = sum(t[0] for t in config_trials)
+        total_attempts = sum(t[1] for t in config_trials)
+        total_checks = sum(t[2] for t in config_trials)
+        total_skipped = sum(t[3] for t in config_trials)
+        num_boards = len(config_trials)
+
+        results.append({
+            "temperature": config.temperature,
+            "banned_color_penalty": config.banned_color_penalty,
+            "same_color_weight": config.same_color_weight,
+            "sec_per_board": total_time / num_boards,
+            # Every attempt that didn't produce a board hit a dead end
+            "dead_end_rate": (total_attempts - num_boards) / total_attempts,
+            "uniqueness_checks_per_board": total_checks / num_boards,
+            "checks_skipped_per_board": total_skipped / num_boards,
+        })
+
+    return sorted(results, key=lambda r: r["sec_per_board"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep generator hyperparameters and report generation speed")
+    parser.add_argument('--size', '-n',
+                        type=int,
+                        default=8,
+                        help='Size of the board (default: 8)')
+    parser.add_argument('--temperatures',
+                        type=float,
+                        nargs='+',
+                        default=[0.1, 0.2, 0.5, 1.0])
+    parser.add_argument('--banned_color_penalties',
+                        type=float,
+                        nargs='+',
+                        default=[DEFAULT_GENERATOR_CONFIG.banned_color_penalty])
+    parser.add_argument('--same_color_weights',
+                        type=float,
+                        nargs='+',
+                        default=[DEFAULT_GENERATOR_CONFIG.same_color_weight])
+    parser.add_argument('--boards_per_setting',
+                        type=int,
+                        default=10,
+                        help="Number of boards to generate for each setting")
+    parser.add_argument('--num_processes', type=int, default=1)
+    parser.add_argument('--output',
+                        type=str,
+                        default=None,
+                        help="Optional path to save the results as json")
+
+    args = parser.parse_args()
+
+    configs = [GeneratorConfig(temperature=t, banned_color_penalty=p,
+                               same_color_weight=w)
+               for t, p, w in itertools.product(args.temperatures,
+                                                args.banned_color_penalties,
+                                                args.same_color_weights)]
+    print(f"Sweeping {len(configs)} settings with {args.boards_per_setting} "
+          f"boards each on {args.num_processes} cores")
+
+    results = run_sweep(args.size, configs, args.boards_per_setting,
+                        args.num_processes)
+
+    print(f"{'temp':>6} {'penalty':>8} {'weight':>7} {'sec/board':>10} "
+          f"{'dead ends':>10} {'checks/board':>13} {'skipped/board':>14}")
+    for r in results:
+        print(f"{r['temperature']:>6} {r['banned_color_penalty']:>8} "
+              f"{r['same_color_weight']:>7} {r['sec_per_board']:>10.3f} "
+              f"{r['dead_end_rate']:>10.1%} {r['uniqueness_checks_per_board']:>13.1f} "
+              f"{r['checks_skipped_per_board']:>14.1f}")
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({"size": args.size, "results": results}, f, indent=2)
@@ -0,0 +1,183 @@
+import sys
+import time
+import threading
+import traceback
+
+from typing import Dict, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from flask import Flask, g, request
+
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Seconds between stack samples taken by the profiler
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Latency histograms by metric name and labels, rendered in Prometheus format"""
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self.help_texts: Dict[str, str] = {}
+        # Flask may serve requests from several threads
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+                self.help_texts.setdefault(name, help_text)
+            self.histograms[key].observe(value)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted(self.help_texts):
+                lines.append(f"# HELP {name} {self.help_texts[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for (key_name, labels), histogram in sorted(self.histograms.items()):
+                    if key_name != name:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        bucket_labels = _format_labels(labels + (("le", str(bound)),))
+                        lines.append(f"{name}_bucket{bucket_labels} {count}")
+                    inf_labels = _format_labels(labels + (("le", "+Inf"),))
+                    lines.append(f"{name}_bucket{inf_labels} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"'
+                          for (key, _), value in zip(labels, escaped)) + "}"
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block of code, recorded in the span duration histogram under name"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("queens_span_duration_seconds", time.perf_counter() - start_time,
+                         "Time spent in instrumented sections of request handling",
+                         span=name)
+
+
+def init_app(app: Flask) -> None:
+    """Record the latency of every request by route, method and status"""
+    @app.before_request
+    def _start_timer():
+        g.request_start_time = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        start_time = g.pop('request_start_time', None)
+        if start_time is not None:
+            # Label by route pattern, not path, so game numbers don't add series
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            registry.observe("queens_request_duration_seconds",
+                             time.perf_counter() - start_time,
+                             "Request latency by route",
+                             route=route, method=request.method,
+                             status=response.status_code)
+        return response
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every other thread at a fixed interval while enabled, so
+    the hot paths of live requests can be found without tracing every call. Counts
+    are kept per innermost frame and per full stack.
+    """
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.frame_counts = Counter()
+        self.stack_counts = Counter()
+        self.num_samples = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.thread is not None
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.stop_event.set()
+            thread.join()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.frame_counts.clear()
+            self.stack_counts.clear()
+            self.num_samples = 0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = tuple(f"{summary.filename}:{summary.lineno} {summary.name}"
+                                  for summary in traceback.extract_stack(frame))
+                    self.frame_counts[stack[-1]] += 1
+                    self.stack_counts[stack] += 1
+                self.num_samples += 1
+
+    def get_report(self, limit: int = 20) -> Dict:
+        """The most sampled frames and stacks, stacks listed outermost call first"""
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'interval': self.interval,
+                'num_samples': self.num_samples,
+                'top_frames': [{'frame': frame, 'count': count} for frame, count
+                               in self.frame_counts.most_common(limit)],
+                'top_stacks': [{'stack': list(stack), 'count': count} for stack, count
+                               in self.stack_counts.most_common(limit)],
+            }
+
+
+profiler = SamplingProfiler()
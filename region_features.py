@@ -0,0 +1,90 @@
+import numpy as np
+
+from typing import Dict, List, Set
+from collections import defaultdict
+
+from get_solutions import get_attack_masks
+
+
+class RegionFeatures:
+    """
+    Per-region square bitboards and row/column span bitmasks, plus the regions in
+    each row and column, kept up to date as the generator colors squares.
+
+    They back cheap structural checks run before the uniqueness search. Coloring a
+    square of a board with a unique solution can only add solutions with that
+    region's queen on the new square, so if a queen there clearly leaves the other
+    regions unable to fit, the board is still unique without searching.
+    """
+    def __init__(self, board: np.ndarray):
+        self.n = board.shape[0]
+        self.attack_masks = get_attack_masks(self.n)
+        self.region_squares: Dict[int, int] = defaultdict(int)
+        self.region_rows: Dict[int, int] = defaultdict(int)
+        self.region_cols: Dict[int, int] = defaultdict(int)
+        self.row_regions: List[Set[int]] = [set() for _ in range(self.n)]
+        self.col_regions: List[Set[int]] = [set() for _ in range(self.n)]
+
+        for row in range(self.n):
+            for col in range(self.n):
+                if board[row, col] != -1:
+                    self.add_square(row, col, int(board[row, col]))
+
+    def add_square(self, row: int, col: int, color: int) -> None:
+        self.region_squares[color] |= 1 << (row * self.n + col)
+        self.region_rows[color] |= 1 << row
+        self.region_cols[color] |= 1 << col
+        self.row_regions[row].add(color)
+        self.col_regions[col].add(color)
+
+    def queen_leaves_region_empty(self, row: int, col: int, color: int) -> bool:
+        """Check if a queen here rules out every square of some other region"""
+        open_squares = ~self.attack_masks[row * self.n + col]
+        for other_color, squares in self.region_squares.items():
+            if other_color != color and not squares & open_squares:
+                return True
+        return False
+
+    def queen_overfills_lines(self, line: int, color: int,
+                              region_lines: Dict[int, int]) -> bool:
+        """
+        Check if taking a row (or column) for this color's queen leaves more regions
+        confined to some one or two rows (or columns) than there are lines for them.
+        Only regions with at most two lines left can be part of that.
+        """
+        line_mask = 1 << line
+        confined = []
+        for other_color, lines in region_lines.items():
+            if other_color == color:
+                continue
+            remaining = lines & ~line_mask
+            if remaining.bit_count() <= 2:
+                confined.append(remaining)
+
+        # A region with no line left, or two regions squeezed into the same line
+        single_lines = [lines for lines in confined if lines.bit_count() <= 1]
+        if 0 in single_lines or len(single_lines) != len(set(single_lines)):
+            return True
+
+        # Three regions squeezed into the same two lines
+        for lines in set(lines for lines in confined if lines.bit_count() == 2):
+            if sum(1 for other in confined if other & ~lines == 0) > 2:
+                return True
+        return False
+
+    def rules_out_new_solution(self, row: int, col: int, color: int) -> bool:
+        """
+        Check whether a queen of color at (row, col) can be ruled out without a
+        search, meaning coloring that square keeps the solution unique. Only
+        regions sharing the row or column lose a line, so those checks are skipped
+        when no other region is in them.
+        """
+        if self.queen_leaves_region_empty(row, col, color):
+            return True
+        if self.row_regions[row] - {color} and \
+                self.queen_overfills_lines(row, color, self.region_rows):
+            return True
+        if self.col_regions[col] - {color} and \
+                self.queen_overfills_lines(col, color, self.region_cols):
+            return True
+        return False
@@ -0,0 +1,93 @@
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Without numba the kernel runs as plain Python"""
+        def decorator(function):
+            return function
+        return decorator
+
+
+# Rows and columns are bits of int64 masks in the kernel
+MAX_KERNEL_BOARD_SIZE = 62
+
+
+@njit(cache=True)
+def find_up_to_two_solutions_kernel(cell_rows: np.ndarray, cell_cols: np.ndarray,
+                                    region_starts: np.ndarray,
+                                    neighbor_masks: np.ndarray, board_size: int,
+                                    solutions: np.ndarray) -> int:
+    """
+    The bitmask search of find_up_to_two_solutions_optimized over flat int arrays,
+    so numba can compile it. Region i's cells are cell_rows/cell_cols[
+    region_starts[i]:region_starts[i + 1]], in search order, and neighbor_masks[col]
+    has the bits of columns col - 1 to col + 1.
+
+    Writes the cell index of each region's queen for up to two solutions into
+    solutions, shape (2, num_regions), and returns the number of solutions found.
+    """
+    num_regions = len(region_starts) - 1
+
+    # Columns of the queen placed in each row, with an empty row above and below
+    # so the rows next to the edges need no bounds checks
+    row_queen_masks = np.zeros(board_size + 2, dtype=np.int64)
+    used_rows = 0
+    used_cols = 0
+
+    # Stack state, the cell of the queen placed for each region so far and the
+    # next cell to try in each region
+    placed_cells = np.zeros(num_regions, dtype=np.int64)
+    next_cells = np.zeros(num_regions + 1, dtype=np.int64)
+    next_cells[0] = region_starts[0]
+    num_solutions = 0
+    region_idx = 0
+
+    while region_idx >= 0:
+        advanced = False
+        if region_idx == num_regions:
+            solutions[num_solutions, :] = placed_cells
+            num_solutions += 1
+            if num_solutions >= 2:
+                break
+        else:
+            cell = next_cells[region_idx]
+            end = region_starts[region_idx + 1]
+            while cell < end:
+                row = cell_rows[cell]
+                col = cell_cols[cell]
+                cell += 1
+
+                if (used_rows >> row) & 1 or (used_cols >> col) & 1:
+                    continue
+                # Queens in the same row are ruled out already, only the rows above
+                # and below can hold a neighbor
+                if (row_queen_masks[row] | row_queen_masks[row + 2]) & neighbor_masks[col]:
+                    continue
+
+                next_cells[region_idx] = cell
+                used_rows |= 1 << row
+                used_cols |= 1 << col
+                row_queen_masks[row + 1] = 1 << col
+                placed_cells[region_idx] = cell - 1
+
+                region_idx += 1
+                next_cells[region_idx] = region_starts[region_idx]
+                advanced = True
+                break
+
+        if not advanced:
+            # Region exhausted, backtrack and revert the previous region's queen
+            region_idx -= 1
+            if region_idx >= 0:
+                cell = placed_cells[region_idx]
+                row = cell_rows[cell]
+                used_rows &= ~(1 << row)
+                used_cols &= ~(1 << cell_cols[cell])
+                row_queen_masks[row + 1] = 0
+
+    return num_solutions
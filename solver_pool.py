@@ -0,0 +1,189 @@
+import os
+import queue
+import threading
+import numpy as np
+import multiprocessing as mp
+
+from typing import List, Tuple, Optional
+from multiprocessing import shared_memory
+
+from get_solutions import find_up_to_two_solutions_optimized, count_solutions
+
+
+# Board squares are stored as uint8, uncolored squares as UNCOLORED
+UNCOLORED = 255
+# Stored queen column for rows without a queen
+NO_QUEEN = 255
+
+# Shared buffers, attached per worker process by _init_worker
+_boards_shm = None
+_results_shm = None
+_boards = None
+_counts = None
+_solutions = None
+
+
+def _get_buffer_views(boards_shm: shared_memory.SharedMemory,
+                      results_shm: shared_memory.SharedMemory, num_slots: int,
+                      max_board_size: int):
+    """
+    Map the shared board and result buffers as numpy arrays. The views are only
+    valid while the shared memory objects are kept alive.
+    """
+    boards = np.ndarray((num_slots, max_board_size, max_board_size), dtype=np.uint8,
+                        buffer=boards_shm.buf)
+    counts = np.ndarray((num_slots,), dtype=np.int64, buffer=results_shm.buf)
+    # Queen column of each row for up to two solutions
+    solutions = np.ndarray((num_slots, 2, max_board_size), dtype=np.uint8,
+                           buffer=results_shm.buf, offset=counts.nbytes)
+    return boards, counts, solutions
+
+
+def _init_worker(boards_name: str, results_name: str, num_slots: int,
+                 max_board_size: int) -> None:
+    global _boards_shm, _results_shm, _boards, _counts, _solutions
+    _boards_shm = shared_memory.SharedMemory(name=boards_name)
+    _results_shm = shared_memory.SharedMemory(name=results_name)
+    _boards, _counts, _solutions = _get_buffer_views(
+        _boards_shm, _results_shm, num_slots, max_board_size)
+
+
+def _solve_slot(slot: int, n: int, count_only: bool, cap: Optional[int]) -> int:
+    """
+    Solve the board in a slot and write the results back to the same slot. Either
+    up to two solutions are found and stored, or solutions are only counted up to
+    cap.
+    """
+    board = _boards[slot, :n, :n].astype(int)
+    board[board == UNCOLORED] = -1
+
+    if not count_only:
+        solutions = find_up_to_two_solutions_optimized(board)
+        _solutions[slot, :, :n] = NO_QUEEN
+        for solution_idx, solution in enumerate(solutions):
+            for row, col in solution:
+                _solutions[slot, solution_idx, row] = col
+        _counts[slot] = len(solutions)
+    else:
+        _counts[slot] = count_solutions(board, cap)
+    return slot
+
+
+class SolverPool:
+    """
+    Long lived pool of solver processes. Boards are written as uint8 grids into a
+    ring of shared memory slots and results are written back into shared memory, so
+    only slot numbers go through the pool's pipes and nothing is pickled per board.
+    """
+    def __init__(self, num_processes: Optional[int] = None, max_board_size: int = 25,
+                 num_slots: Optional[int] = None):
+        self.num_processes = num_processes or os.cpu_count()
+        self.max_board_size = max_board_size
+        # A few slots per worker keeps every worker busy while results are read
+        self.num_slots = num_slots or 4 * self.num_processes
+
+        board_bytes = self.num_slots * max_board_size * max_board_size
+        result_bytes = self.num_slots * (8 + 2 * max_board_size)
+        self.boards_shm = shared_memory.SharedMemory(create=True, size=board_bytes)
+        self.results_shm = shared_memory.SharedMemory(create=True, size=result_bytes)
+        self.boards, self.counts, self.solutions = _get_buffer_views(
+            self.boards_shm, self.results_shm, self.num_slots, max_board_size)
+
+        # Calls share the slots, so only run one batch at a time
+        self.lock = threading.Lock()
+        self.pool = mp.Pool(processes=self.num_processes,
+                            initializer=_init_worker,
+                            initargs=(self.boards_shm.name, self.results_shm.name,
+                                      self.num_slots, max_board_size))
+
+    def _run(self, boards: List[np.ndarray], count_only: bool, cap: Optional[int],
+             read_result) -> List:
+        """
+        Feed boards through the slot ring, a board is written once a slot is free
+        and its result is read out as soon as its worker is done with it
+        """
+        # Check every board before writing any, so a bad batch changes no slots
+        for board in boards:
+            n = np.asarray(board).shape[0]
+            if n > self.max_board_size:
+                raise ValueError(f"Board size {n} is larger than the pool's max "
+                                 f"board size {self.max_board_size}")
+
+        results = [None] * len(boards)
+        done_slots = queue.Queue()
+        slot_to_board_idx = {}
+
+        def submit(slot: int, board_idx: int) -> None:
+            board = np.asarray(boards[board_idx])
+            n = board.shape[0]
+            self.boards[slot, :n, :n] = np.where(board == -1, UNCOLORED, board)
+            slot_to_board_idx[slot] = board_idx
+            self.pool.apply_async(_solve_slot, (slot, n, count_only, cap),
+                                  callback=done_slots.put,
+                                  error_callback=done_slots.put)
+
+        with self.lock:
+            next_board_idx = 0
+            num_in_flight = 0
+            try:
+                for slot in range(min(self.num_slots, len(boards))):
+                    submit(slot, next_board_idx)
+                    next_board_idx += 1
+                    num_in_flight += 1
+
+                for _ in range(len(boards)):
+                    slot = done_slots.get()
+                    num_in_flight -= 1
+                    if isinstance(slot, BaseException):
+                        raise slot
+                    board_idx = slot_to_board_idx.pop(slot)
+                    results[board_idx] = read_result(slot, len(boards[board_idx]))
+
+                    if next_board_idx < len(boards):
+                        submit(slot, next_board_idx)
+                        next_board_idx += 1
+                        num_in_flight += 1
+            finally:
+                # After an error, boards still being solved would write their
+                # results into slots the next call reuses, so wait them out
+                while num_in_flight > 0:
+                    done_slots.get()
+                    num_in_flight -= 1
+
+        return results
+
+    def _read_solutions(self, slot: int, n: int) -> List[List[Tuple[int, int]]]:
+        solutions = []
+        for solution_idx in range(int(self.counts[slot])):
+            columns = self.solutions[slot, solution_idx, :n]
+            solutions.append([(row, int(col)) for row, col in enumerate(columns)
+                              if col != NO_QUEEN])
+        return solutions
+
+    def find_up_to_two_solutions(self, boards: List[np.ndarray]
+                                 ) -> List[List[List[Tuple[int, int]]]]:
+        """find_up_to_two_solutions_optimized for each board, in the same order"""
+        return self._run(boards, False, None, self._read_solutions)
+
+    def count_solutions(self, boards: List[np.ndarray], cap: Optional[int] = None
+                        ) -> List[int]:
+        """count_solutions for each board, in the same order"""
+        return self._run(boards, True, cap, lambda slot, n: int(self.counts[slot]))
+
+    def __enter__(self) -> "SolverPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.boards is None:
+            return
+        self.pool.terminate()
+        self.pool.join()
+        # Drop the numpy views before closing the buffers they point into
+        self.boards = self.counts = self.solutions = None
+        self.boards_shm.close()
+        self.boards_shm.unlink()
+        self.results_shm.close()
+        self.results_shm.unlink()
@@ -0,0 +1,108 @@
+import os
+import re
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+
+from typing import Dict
+
+from board_metadata import get_game_numbers, load_metadata_index
+from wire_format import encode_grid, get_regions_id
+
+
+# Exported into the static folder so any static file server can serve it
+DEFAULT_EXPORT_DIR = os.path.join("static", "games")
+# The only exported file that isn't content hashed, clients must revalidate it
+MANIFEST_FILENAME = "manifest.json"
+
+
+def get_game_file(board: np.ndarray) -> Dict:
+    """What game.html needs to show a pregenerated game, the queens stay private"""
+    return {
+        "size": int(board.shape[0]),
+        "regions_id": get_regions_id(board),
+        "regions": encode_grid(board),
+    }
+
+
+def export_games(games_dir: str = "pregenerated_games",
+                 export_dir: str = DEFAULT_EXPORT_DIR) -> Dict:
+    """
+    Write every board_size_<n>/<k>.pkl game in games_dir to
+    export_dir/board_size_<n>/<regions_id>.json, and a manifest listing each size's
+    games, their metadata if the index is built, and their files. Files no longer
+    in the manifest are removed. Returns the manifest.
+    """
+    manifest = {"sizes": {}}
+    exported_paths = set()
+
+    for dirname in sorted(os.listdir(games_dir)):
+        size_dir = os.path.join(games_dir, dirname)
+        match = re.fullmatch(r'board_size_(\d+)', dirname)
+        if match is None or not os.path.isdir(size_dir):
+            continue
+        game_numbers = get_game_numbers(size_dir)
+        if not game_numbers:
+            continue
+
+        os.makedirs(os.path.join(export_dir, dirname), exist_ok=True)
+        files = {}
+        for game_number in game_numbers:
+            with open(os.path.join(size_dir, f"{game_number}.pkl"), 'rb') as f:
+                board = np.asarray(pickle.load(f)['board'])
+            game_file = get_game_file(board)
+
+            # Named by content, so an existing file is already up to date
+            path = f"{dirname}/{game_file['regions_id']}.json"
+            full_path = os.path.join(export_dir, path)
+            if not os.path.exists(full_path):
+                with open(full_path, 'w') as f:
+                    json.dump(game_file, f)
+            files[str(game_number)] = path
+            exported_paths.add(os.path.normpath(full_path))
+
+        # Same fields as /api/available_games/<size>, plus the files
+        size = int(match.group(1))
+        metadata = load_metadata_index(size_dir)
+        manifest["sizes"][str(size)] = {
+            "size": size,
+            "games": game_numbers,
+            "metadata": {str(game_number): metadata[game_number]
+                         for game_number in game_numbers if game_number in metadata},
+            "files": files,
+        }
+
+    # Replace the manifest in one step so clients never see it point to files that
+    # aren't written yet
+    manifest_path = os.path.join(export_dir, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    for dirname in os.listdir(export_dir):
+        if not re.fullmatch(r'board_size_(\d+)', dirname):
+            continue
+        for filename in os.listdir(os.path.join(export_dir, dirname)):
+            path = os.path.normpath(os.path.join(export_dir, dirname, filename))
+            if filename.endswith('.json') and path not in exported_paths:
+                os.remove(path)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the pregenerated games as static files that game.html and "
+                    "select_game.html load without the Python backend")
+    parser.add_argument('--games_dir', type=str, default="pregenerated_games")
+    parser.add_argument('--export_dir', type=str, default=DEFAULT_EXPORT_DIR)
+
+    args = parser.parse_args()
+
+    start_time = time.time()
+    manifest = export_games(args.games_dir, args.export_dir)
+    num_games = sum(len(size_data["games"]) for size_data in manifest["sizes"].values())
+    print(f"Exported {num_games} games of sizes {sorted(map(int, manifest['sizes']))} "
+          f"to {args.export_dir} in {time.time() - start_time:.2f} seconds")
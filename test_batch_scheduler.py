@@ -0,0 +1,42 @@
+import os
+import pickle
+
+from batch_scheduler import ThroughputScheduler, run_batch
+from get_solutions import find_up_to_two_solutions_optimized
+
+
+def test_scheduler_shares_workers_by_remaining_work():
+    scheduler = ThroughputScheduler({8: 100, 12: 10})
+    now = 0.0
+    # Small boards take 1s and big ones 30s, so the 12s have 3x the work left
+    for n, seconds in [(8, 1.0), (12, 30.0)]:
+        scheduler.start(n, now)
+        scheduler.finish(n, seconds)
+
+    sizes = []
+    for _ in range(8):
+        n = scheduler.next_size(now)
+        scheduler.start(n, now)
+        sizes.append(n)
+    assert sizes.count(12) == 6 and sizes.count(8) == 2
+
+    # Sizes never get more boards started than they still need
+    scheduler = ThroughputScheduler({8: 1})
+    scheduler.start(scheduler.next_size(now), now)
+    assert scheduler.next_size(now) is None
+
+
+def test_run_batch(tmp_path):
+    games_dir = str(tmp_path)
+    os.makedirs(os.path.join(games_dir, "board_size_6"))
+    with open(os.path.join(games_dir, "board_size_6", "1.pkl"), 'wb') as f:
+        pickle.dump({}, f)
+
+    stats = run_batch({6: 3, 7: 2}, num_processes=2, games_dir=games_dir)
+    assert stats[6]["num_boards"] == 3 and stats[7]["num_boards"] == 2
+
+    assert sorted(os.listdir(os.path.join(games_dir, "board_size_6"))) == \
+        ["1.pkl", "2.pkl", "3.pkl", "4.pkl"]
+    with open(os.path.join(games_dir, "board_size_7", "2.pkl"), 'rb') as f:
+        game_data = pickle.load(f)
+    assert len(find_up_to_two_solutions_optimized(game_data["board"])) == 1
@@ -0,0 +1,38 @@
+import numpy as np
+
+from board_index import (BoardIndex, canonicalize_board, get_board_hash,
+                         get_board_symmetries)
+from board_fixtures import UNIQUE_BOARD_8X8 as board
+
+
+def test_symmetries_and_relabeling_share_hash():
+    board_hash = get_board_hash(board)
+    permutation = np.random.permutation(8)
+
+    for symmetric_board in get_board_symmetries(board):
+        assert get_board_hash(symmetric_board) == board_hash
+        assert get_board_hash(permutation[symmetric_board]) == board_hash
+
+
+def test_canonical_form_labels_by_first_appearance():
+    canonical = canonicalize_board(board)
+    assert canonical[0, 0] == 0
+    assert sorted(set(canonical.flatten())) == list(range(8))
+
+
+def test_different_boards_differ():
+    other_board = board.copy()
+    other_board[0, 7] = 6
+    other_board[0, 6] = 4
+    assert get_board_hash(other_board) != get_board_hash(board)
+
+
+def test_board_index(tmp_path):
+    index_path = str(tmp_path / "index.json")
+    index = BoardIndex(index_path)
+
+    assert index.add(board, "a.pkl")
+    assert not index.add(np.rot90(board), "b.pkl")
+    index.save()
+
+    assert BoardIndex(index_path).contains(np.fliplr(board))
@@ -0,0 +1,39 @@
+import os
+import json
+import pickle
+import numpy as np
+
+from board_metadata import build_metadata_index, load_metadata_index
+from get_solutions import find_up_to_two_solutions_optimized
+from wire_format import decode_grid
+from board_fixtures import UNIQUE_BOARD_8X8 as board
+
+
+queens = find_up_to_two_solutions_optimized(board)[0]
+
+
+def test_build_metadata_index(tmp_path):
+    size_dir = str(tmp_path)
+    for game_number, game_board in [(1, board), (2, board.T)]:
+        with open(os.path.join(size_dir, f"{game_number}.pkl"), 'wb') as f:
+            pickle.dump({"board": game_board, "queens": queens}, f)
+
+    metadata = build_metadata_index(size_dir)
+    assert load_metadata_index(size_dir) == metadata
+    assert sorted(metadata) == [1, 2]
+    assert metadata[1]["region_sizes"]["min"] == 1
+    assert metadata[1]["region_sizes"]["max"] == np.bincount(board.flatten()).max()
+    assert metadata[1]["difficulty"] > 0
+    assert (decode_grid(metadata[2]["thumbnail"], 8) == board.T).all()
+
+    # Unchanged games keep their metadata, changed ones are rebuilt
+    metadata[1]["difficulty"] = -1.0
+    metadata[2]["difficulty"] = -1.0
+    with open(os.path.join(size_dir, "metadata.json"), 'w') as f:
+        json.dump({str(k): v for k, v in metadata.items()}, f)
+    with open(os.path.join(size_dir, "2.pkl"), 'wb') as f:
+        pickle.dump({"board": board, "queens": queens}, f)
+
+    rebuilt = build_metadata_index(size_dir)
+    assert rebuilt[1]["difficulty"] == -1.0
+    assert rebuilt[2]["difficulty"] > 0
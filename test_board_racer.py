@@ -0,0 +1,25 @@
+import time
+
+from board_racer import BoardRacer
+from get_solutions import find_up_to_two_solutions_optimized
+
+
+def test_race_finds_unique_board():
+    board_racer = BoardRacer(num_processes=2)
+    try:
+        for size in [6, 7, 8]:
+            board, queens = board_racer.race(size, timeout=60)
+            assert board.shape == (size, size)
+            assert len(find_up_to_two_solutions_optimized(board)) == 1
+
+        # Pool stays usable after a race times out
+        assert board_racer.race(10, timeout=0) is None
+        assert board_racer.race(6, timeout=60) is not None
+
+        # A race waiting on another one still gives up at its own deadline
+        with board_racer.lock:
+            start_time = time.time()
+            assert board_racer.race(6, timeout=0.2) is None
+            assert time.time() - start_time < 1
+    finally:
+        board_racer.close()
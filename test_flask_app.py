@@ -0,0 +1,61 @@
+import time
+import threading
+
+import flask_app
+from flask_app import app, GameStateManager
+
+
+def test_hint_rejects_invalid_marks():
+    client = app.test_client()
+    assert client.get('/api/select_game/12/0').status_code == 200
+
+    assert client.post('/api/hint', json={'marks': [[5] * 12] * 12}).status_code == 400
+    assert client.post('/api/hint', json={'marks': [[0] * 8] * 8}).status_code == 400
+    response = client.post('/api/hint', json={'marks': [[0] * 12] * 12})
+    assert response.status_code == 200
+    assert response.get_json()['action'] in ['place', 'eliminate']
+
+
+def test_marks_rejects_malformed_deltas():
+    client = app.test_client()
+    version = client.get('/api/select_game/12/0').get_json()['version']
+
+    for deltas in [5, [5], [[True, 1]], [[0, 1, 2]], [["0", 1]], [[0, 5]]]:
+        response = client.post('/api/marks', json={'version': version, 'deltas': deltas})
+        assert response.status_code == 400
+    assert client.post('/api/marks', json=[[0, 1]]).status_code == 400
+    response = client.post('/api/marks', json={'version': version, 'deltas': [[0, 1]]})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == version + 1
+
+
+def test_board_racer_started_once(monkeypatch):
+    started = []
+
+    def slow_racer():
+        time.sleep(0.05)
+        started.append(object())
+        return started[-1]
+
+    monkeypatch.setattr(flask_app, 'BoardRacer', slow_racer)
+    manager = GameStateManager()
+    threads = [threading.Thread(target=manager.get_board_racer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(started) == 1
+    assert manager.get_board_racer() is started[0]
+
+
+def test_session_cookie_is_timed():
+    client = app.test_client()
+    client.get('/api/select_game/12/0')
+    client.get('/api/state')
+
+    spans = {dict(labels).get('span'): histogram.count
+             for (name, labels), histogram in flask_app.registry.histograms.items()
+             if name == 'queens_span_duration_seconds'}
+    assert spans.get('session_decode', 0) >= 2
+    assert spans.get('session_encode', 0) >= 1
@@ -1,6 +1,10 @@
 import numpy as np
 
-from get_solutions import find_up_to_two_solutions, find_up_to_two_solutions_optimized
+from get_solutions import (find_up_to_two_solutions, find_up_to_two_solutions_optimized,
+                           count_search_nodes, iter_solutions, count_solutions,
+                           has_solution_with_queen, find_row_bands,
+                           find_up_to_two_solutions_banded)
+from board_fixtures import UNIQUE_BOARD_8X8
 
 
 def test_unique_solution_board_big():
@@ -65,4 +69,94 @@ def test_non_unique_solution_board_big():
        [ 2,  2,  2,  2,  2,  2,  2,  2,  3,  3,  3,  3]])
 
     solutions = find_up_to_two_solutions_optimized(non_unique_solution_board)
-    assert len(solutions) == 2
\ No newline at end of file
+    assert len(solutions) == 2
+
+def test_count_search_nodes():
+    board = UNIQUE_BOARD_8X8
+    # At least one node per placed queen plus the root
+    assert count_search_nodes(board) >= 9
+
+
+def test_count_and_iter_solutions():
+    non_unique_solution_board = np.array([
+       [-1, -1, -1,  3,  3, -1],
+       [-1, -1, -1, -1, -1,  1],
+       [ 4, -1,  0, -1, -1, -1],
+       [ 4, -1,  0, -1, -1, -1],
+       [-1, -1, -1, -1,  2, -1],
+       [-1,  5, -1, -1, -1, -1]])
+    all_solutions = list(iter_solutions(non_unique_solution_board))
+    num_solutions = count_solutions(non_unique_solution_board)
+
+    assert num_solutions == len(all_solutions) == 2
+    assert len(set(tuple(s) for s in all_solutions)) == num_solutions
+    assert count_solutions(non_unique_solution_board, cap=1) == 1
+    assert list(iter_solutions(non_unique_solution_board, limit=1)) == all_solutions[:1]
+    assert find_up_to_two_solutions_optimized(non_unique_solution_board) == \
+        all_solutions[:2]
+
+    # Two regions filling the top and bottom rows, any two different columns work
+    two_row_board = np.full((6, 6), -1)
+    two_row_board[0, :] = 0
+    two_row_board[5, :] = 1
+    assert count_solutions(two_row_board) == 30
+    assert len(list(iter_solutions(two_row_board))) == 30
+    assert count_solutions(two_row_board, cap=7) == 7
+
+
+def test_has_solution_with_queen():
+    unique_solution_board = UNIQUE_BOARD_8X8
+    solution = find_up_to_two_solutions_optimized(unique_solution_board)[0]
+
+    for row in range(8):
+        for col in range(8):
+            assert has_solution_with_queen(unique_solution_board, (row, col)) == \
+                ((row, col) in solution)
+
+
+def test_large_board_solutions():
+    # Every row is its own region, a 20x20 board needs masks wider than 64 bits
+    board = np.repeat(np.arange(20)[:, None], 20, axis=1)
+    solutions = find_up_to_two_solutions_optimized(board)
+
+    assert len(solutions) == 2
+    for solution in solutions:
+        assert len(set(col for _, col in solution)) == 20
+        for (r1, c1), (r2, c2) in zip(solution, solution[1:]):
+            assert abs(c1 - c2) > 1
+    assert has_solution_with_queen(board, (0, 0))
+
+
+def test_banded_solutions():
+    # Regions 0-1 stay in rows 0-1, 2 in row 2 and 3-5 in rows 3-5
+    board = np.array([
+        [0, 0, 0, 1, 1, 1],
+        [0, 1, 1, 1, 1, 1],
+        [2, 2, 2, 2, 2, 2],
+        [3, 3, 4, 4, 4, 5],
+        [3, 4, 4, 5, 5, 5],
+        [3, 3, 3, 3, 5, 5]])
+    assert find_row_bands(board) == [(0, 2), (2, 3), (3, 6)]
+    assert find_row_bands(board.T) == [(0, 6)]
+
+    all_solutions = list(iter_solutions(board))
+    for test_board, solutions in [(board, all_solutions),
+                                  (board.T, [sorted((c, r) for r, c in solution)
+                                             for solution in all_solutions])]:
+        banded_solutions = find_up_to_two_solutions_banded(test_board)
+        assert len(banded_solutions) == min(2, len(solutions))
+        assert all(solution in solutions for solution in banded_solutions)
+
+    # Every row is its own band
+    rows_board = np.repeat(np.arange(20)[:, None], 20, axis=1)
+    assert len(find_row_bands(rows_board)) == 20
+    assert len(find_up_to_two_solutions_banded(rows_board)) == 2
+
+    # Regions 0 and 2 are both confined to column 0, in different bands
+    no_solution_board = rows_board.copy()
+    no_solution_board[0:2, :] = 1
+    no_solution_board[0:2, 0] = 0
+    no_solution_board[2:4, :] = 3
+    no_solution_board[2:4, 0] = 2
+    assert find_up_to_two_solutions_banded(no_solution_board) == \
+        find_up_to_two_solutions_optimized(no_solution_board) == []
@@ -0,0 +1,50 @@
+import numpy as np
+
+from hints import get_hint, _hint_cache, EMPTY, MARK_X, MARK_QUEEN
+from get_solutions import find_up_to_two_solutions_optimized
+from board_fixtures import UNIQUE_BOARD_8X8 as board
+
+
+solution = find_up_to_two_solutions_optimized(board)[0]
+
+
+def test_single_square_region_is_placed():
+    hint = get_hint(board, np.zeros((8, 8), dtype=int))
+    # Regions 4 and 7 are a single square each
+    assert hint['action'] == 'place'
+    assert tuple(hint['cell']) in [(0, 7), (7, 1)]
+
+
+def test_following_hints_solves_board():
+    marks = np.zeros((8, 8), dtype=int)
+    for _ in range(8 * 8 + 1):
+        hint = get_hint(board, marks)
+        if hint['action'] == 'solved':
+            break
+        assert hint['action'] in ['place', 'eliminate']
+        row, col = hint['cell']
+        assert marks[row, col] == EMPTY
+        marks[row, col] = MARK_QUEEN if hint['action'] == 'place' else MARK_X
+
+    assert hint['action'] == 'solved'
+    assert sorted(zip(*np.where(marks == MARK_QUEEN))) == solution
+
+
+def test_mistakes_are_reported():
+    marks = np.zeros((8, 8), dtype=int)
+    marks[solution[0]] = MARK_X
+    hint = get_hint(board, marks)
+
+    assert hint['action'] == 'mistake'
+    assert tuple(hint['cell']) == solution[0]
+
+
+def test_hints_cached_by_digest():
+    marks = np.zeros((8, 8), dtype=int)
+    marks[0, 0] = MARK_X
+    hint = get_hint(board, marks)
+    assert get_hint(board, marks.astype(np.uint8)) == hint
+
+    key = _hint_cache.get_key(board, marks)
+    assert len(key) == 16
+    assert _hint_cache.hints[key] == hint
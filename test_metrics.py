@@ -0,0 +1,35 @@
+import time
+
+from metrics import MetricsRegistry, SamplingProfiler, registry, span
+
+
+def test_histogram_rendering():
+    metrics = MetricsRegistry()
+    metrics.observe("latency_seconds", 0.003, "Latency", route="/a")
+    metrics.observe("latency_seconds", 2.0, "Latency", route="/a")
+    metrics.observe("latency_seconds", 0.5, "Latency", route='/"b"')
+    text = metrics.render_prometheus()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.0025"} 0' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/a"} 2' in text
+    assert 'latency_seconds_count{route="/\\"b\\""} 1' in text
+
+
+def test_span_and_profiler():
+    with span("test_span"):
+        pass
+    assert 'queens_span_duration_seconds_count{span="test_span"} 1' in \
+        registry.render_prometheus()
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.time() + 0.2
+    while time.time() < deadline:
+        sum(range(1000))
+    profiler.stop()
+    report = profiler.get_report()
+    assert not report['enabled']
+    assert report['num_samples'] > 0 and report['top_frames']
@@ -0,0 +1,45 @@
+import random
+import numpy as np
+
+from board_generator import generate_random_queens
+from get_solutions import has_solution_with_queen
+from region_features import RegionFeatures
+
+
+def test_confined_regions_rule_out_queen():
+    board = np.full((6, 6), -1)
+    board[0, 0] = board[0, 1] = 0
+    board[2, 2] = board[2, 3] = 1
+    board[4, 3] = board[5, 3] = 2
+    features = RegionFeatures(board)
+
+    # A color 2 queen in row 2 would leave no room for region 1
+    assert features.rules_out_new_solution(2, 5, 2)
+    # Regions 1 and 2 both only have column 3 left once a queen takes column 2
+    assert features.queen_overfills_lines(2, 0, features.region_cols)
+    # In row 3 nothing is confined
+    assert not features.rules_out_new_solution(3, 0, 0)
+
+
+def test_rules_out_new_solution_is_sound():
+    random.seed(0)
+    np.random.seed(0)
+    n = 7
+    for _ in range(200):
+        queens = generate_random_queens(n)
+        board = np.full((n, n), -1)
+        for color, (row, col) in enumerate(queens):
+            board[row, col] = color
+        # Color a random half of the other squares
+        for row in range(n):
+            for col in range(n):
+                if board[row, col] == -1 and random.random() < 0.5:
+                    board[row, col] = random.randrange(n)
+
+        features = RegionFeatures(board)
+        row, col = random.choice([(r, c) for r in range(n) for c in range(n)
+                                  if board[r, c] == -1])
+        color = random.randrange(n)
+        board[row, col] = color
+        if features.rules_out_new_solution(row, col, color):
+            assert not has_solution_with_queen(board, (row, col))
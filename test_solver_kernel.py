@@ -0,0 +1,70 @@
+import pickle
+import random
+import pytest
+import numpy as np
+
+from glob import glob
+
+import get_solutions
+from get_solutions import (find_up_to_two_solutions_bitmask,
+                           find_up_to_two_solutions_jit,
+                           find_up_to_two_solutions_optimized)
+from solver_kernel import NUMBA_AVAILABLE, find_up_to_two_solutions_kernel
+from board_fixtures import UNIQUE_BOARD_8X8
+
+
+def get_pregenerated_boards(pattern: str):
+    boards = []
+    for path in sorted(glob(f"pregenerated_games/{pattern}/*.pkl")):
+        with open(path, 'rb') as f:
+            boards.append(np.asarray(pickle.load(f)['board']))
+    return boards
+
+
+def get_test_boards(pattern: str):
+    boards = get_pregenerated_boards(pattern)
+
+    # Every row is its own region, many solutions
+    boards.append(np.repeat(np.arange(20)[:, None], 20, axis=1))
+    boards.append(UNIQUE_BOARD_8X8)
+
+    # Merged regions and uncolored squares give boards with several or no solutions
+    random.seed(0)
+    for board in boards[:]:
+        merged = board.copy()
+        merged[merged == random.randrange(len(board))] = random.randrange(len(board))
+        boards.append(merged)
+        uncolored = board.copy()
+        uncolored[random.randrange(len(board)), :] = -1
+        boards.append(uncolored)
+    return boards
+
+
+def check_kernel_matches_python_solver(boards):
+    for board in boards:
+        solutions = find_up_to_two_solutions_bitmask(board)
+        assert find_up_to_two_solutions_jit(board) == solutions
+        assert find_up_to_two_solutions_optimized(board) == solutions
+
+
+def test_kernel_matches_python_solver():
+    # Without numba the kernel runs as plain Python, so this checks its logic either way
+    check_kernel_matches_python_solver(get_test_boards("board_size_12"))
+
+
+def test_python_kernel_matches_python_solver_on_corpus(monkeypatch):
+    # The undecorated kernel, so every pregenerated board is checked with or without
+    # numba. The original find_up_to_two_solutions takes minutes per 14x14 board, so
+    # the bitmask search is the reference.
+    python_kernel = getattr(find_up_to_two_solutions_kernel, 'py_func',
+                            find_up_to_two_solutions_kernel)
+    monkeypatch.setattr(get_solutions, 'find_up_to_two_solutions_kernel', python_kernel)
+    boards = get_pregenerated_boards("board_size_*")
+    assert boards
+    for board in boards:
+        assert find_up_to_two_solutions_jit(board) == find_up_to_two_solutions_bitmask(board)
+
+
+@pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba not installed")
+def test_compiled_kernel_matches_python_solver_on_corpus():
+    check_kernel_matches_python_solver(get_test_boards("board_size_*"))
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+
+from multiprocessing import shared_memory
+
+from board_generator import generate_random_queens, generate_regions_jagged
+from get_solutions import find_up_to_two_solutions_optimized, count_solutions
+from solver_pool import SolverPool
+
+
+def test_solver_pool_matches_solvers():
+    np.random.seed(0)
+    boards = []
+    while len(boards) < 10:
+        size = len(boards) % 4 + 5
+        board = generate_regions_jagged(generate_random_queens(size), size)
+        if board is not None:
+            boards.append(board)
+    # Boards with several solutions and uncolored squares
+    boards.append(np.repeat(np.arange(6), 6).reshape(6, 6))
+    partial_board = boards[0].copy()
+    partial_board[partial_board == 0] = -1
+    boards.append(partial_board)
+
+    # Fewer slots than boards so slots get reused
+    with SolverPool(num_processes=2, max_board_size=8, num_slots=3) as solver_pool:
+        # A batch with a board that's too big fails without touching any slot
+        with pytest.raises(ValueError):
+            solver_pool.count_solutions(boards + [np.zeros((9, 9), dtype=int)])
+
+        # Failing partway through waits for the boards still being solved, so they
+        # can't write into slots the next batch uses
+        def failing_read_result(slot, n):
+            raise RuntimeError("read failed")
+        with pytest.raises(RuntimeError):
+            solver_pool._run(boards, True, 100, failing_read_result)
+
+        assert solver_pool.find_up_to_two_solutions(boards) == \
+            [find_up_to_two_solutions_optimized(board) for board in boards]
+        assert solver_pool.count_solutions(boards, cap=100) == \
+            [count_solutions(board, 100) for board in boards]
+        shm_name = solver_pool.boards_shm.name
+
+    # Shared memory is unlinked on leaving the with block
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)
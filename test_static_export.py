@@ -0,0 +1,40 @@
+import os
+import json
+import pickle
+
+from static_export import export_games, MANIFEST_FILENAME
+from wire_format import decode_grid, get_regions_id
+from board_fixtures import UNIQUE_BOARD_8X8 as board
+
+
+def test_export_games(tmp_path):
+    games_dir = tmp_path / "games"
+    export_dir = str(tmp_path / "export")
+    size_dir = games_dir / "board_size_8"
+    os.makedirs(size_dir)
+    for game_number, game_board in [(1, board), (2, board.T)]:
+        with open(size_dir / f"{game_number}.pkl", 'wb') as f:
+            pickle.dump({"board": game_board, "queens": []}, f)
+
+    manifest = export_games(str(games_dir), export_dir)
+    with open(os.path.join(export_dir, MANIFEST_FILENAME)) as f:
+        assert json.load(f) == manifest
+
+    size_data = manifest["sizes"]["8"]
+    assert size_data["games"] == [1, 2]
+    assert size_data["metadata"] == {}
+    for game_number, game_board in [("1", board), ("2", board.T)]:
+        path = size_data["files"][game_number]
+        assert path == f"board_size_8/{get_regions_id(game_board)}.json"
+        with open(os.path.join(export_dir, path)) as f:
+            game_file = json.load(f)
+        assert (decode_grid(game_file["regions"], 8) == game_board).all()
+        assert "queens" not in game_file
+
+    # Files of changed games are replaced, not left behind
+    with open(size_dir / "2.pkl", 'wb') as f:
+        pickle.dump({"board": board, "queens": []}, f)
+    manifest = export_games(str(games_dir), export_dir)
+    assert manifest["sizes"]["8"]["files"]["2"] == manifest["sizes"]["8"]["files"]["1"]
+    assert os.listdir(os.path.join(export_dir, "board_size_8")) == \
+        [f"{get_regions_id(board)}.json"]
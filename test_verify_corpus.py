@@ -0,0 +1,41 @@
+import pickle
+import numpy as np
+
+from verify_corpus import verify_board, verify_corpus
+from get_solutions import find_up_to_two_solutions_optimized
+from board_fixtures import UNIQUE_BOARD_8X8 as board
+
+
+queens = find_up_to_two_solutions_optimized(board)[0]
+
+
+def test_verify_board():
+    assert verify_board(board, list(reversed(queens)))["valid"]
+
+    wrong_queens = queens[1:] + [(0, 0)]
+    result = verify_board(board, wrong_queens)
+    assert result["num_solutions"] == 1 and not result["queens_match"]
+
+    # Stored queens are a solution, but not the only one
+    rows_board = np.repeat(np.arange(6)[:, None], 6, axis=1)
+    result = verify_board(rows_board, find_up_to_two_solutions_optimized(rows_board)[0])
+    assert result["num_solutions"] == 2 and result["queens_match"]
+    assert not result["valid"]
+
+
+def test_verify_corpus_uses_cache(tmp_path):
+    paths = []
+    for i, board_queens in enumerate([queens, queens[1:] + [(0, 0)]]):
+        path = str(tmp_path / f"{i}.pkl")
+        with open(path, 'wb') as f:
+            pickle.dump({"board": board, "queens": board_queens}, f)
+        paths.append(path)
+
+    results = verify_corpus(paths, num_processes=2)
+    assert [r["valid"] for r in results] == [True, False]
+    assert not any(r["cached"] for r in results)
+
+    cache = {results[0]["hash"]: {"num_solutions": 1, "queens_match": True,
+                                  "valid": True, "solve_seconds": 0.0}}
+    results = verify_corpus(paths, num_processes=2, cache=cache)
+    assert [r["cached"] for r in results] == [True, False]
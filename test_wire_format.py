@@ -0,0 +1,24 @@
+import numpy as np
+
+from wire_format import encode_grid, decode_grid, get_regions_id, apply_mark_deltas
+
+
+def test_grid_round_trip():
+    grid = np.random.randint(0, 25, size=(25, 25))
+    assert (decode_grid(encode_grid(grid), 25) == grid).all()
+    assert get_regions_id(grid) == get_regions_id(grid.copy())
+
+
+def test_apply_mark_deltas():
+    marks = np.zeros((4, 4), dtype=int)
+    assert apply_mark_deltas(marks, [[0, 1], [5, 2]])
+    assert marks[0, 0] == 1 and marks[1, 1] == 2
+
+    # Invalid updates leave marks unchanged
+    assert not apply_mark_deltas(marks, [[1, 1], [16, 1]])
+    assert not apply_mark_deltas(marks, [[1, 3]])
+    assert not apply_mark_deltas(marks, 5)
+    assert not apply_mark_deltas(marks, [5])
+    assert not apply_mark_deltas(marks, [[True, 1]])
+    assert not apply_mark_deltas(marks, [[1, True]])
+    assert marks.sum() == 3
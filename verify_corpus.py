@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import numpy as np
+import multiprocessing as mp
+
+from typing import List, Dict, Optional
+from glob import glob
+
+from get_solutions import find_up_to_two_solutions_banded, has_other_solution
+
+
+# Cached results by board content hash, set per worker process by _init_worker
+_cache = {}
+
+
+def _init_worker(cache: Dict[str, Dict]) -> None:
+    global _cache
+    _cache = cache
+
+
+def get_board_content_hash(board: np.ndarray, queens: List) -> str:
+    """Hash of the exact board layout and stored queens"""
+    board = np.ascontiguousarray(board, dtype=np.int64)
+    queens = sorted((int(r), int(c)) for r, c in queens)
+    data = f"{board.shape}:{queens}:".encode() + board.tobytes()
+    return hashlib.sha1(data).hexdigest()
+
+
+def is_solution(board: np.ndarray, queens: List) -> bool:
+    """Check queens are one per region, row and column with no two adjacent"""
+    n = len(board)
+    regions = set(int(color) for color in board.flatten() if color != -1)
+    if len(queens) != len(regions) or \
+            any(not (0 <= r < n and 0 <= c < n) for r, c in queens):
+        return False
+    if set(int(board[r, c]) for r, c in queens) != regions or \
+            len(set(r for r, _ in queens)) != len(queens) or \
+            len(set(c for _, c in queens)) != len(queens):
+        return False
+    return all(abs(r1 - r2) > 1 or abs(c1 - c2) > 1
+               for i, (r1, c1) in enumerate(queens) for r2, c2 in queens[i + 1:])
+
+
+def verify_board(board: np.ndarray, queens: List) -> Dict:
+    """
+    Check a board has exactly one solution and the stored queens are a solution.
+    When they are, only a second one has to be ruled out, which is much faster than
+    solving the board.
+    """
+    stored_queens = sorted((int(r), int(c)) for r, c in queens)
+    start_time = time.time()
+    queens_match = is_solution(board, stored_queens)
+    if queens_match:
+        num_solutions = 2 if has_other_solution(board, stored_queens) else 1
+    else:
+        num_solutions = len(find_up_to_two_solutions_banded(board))
+    solve_seconds = time.time() - start_time
+
+    return {
+        "num_solutions": num_solutions,
+        "queens_match": queens_match,
+        "valid": num_solutions == 1 and queens_match,
+        "solve_seconds": solve_seconds,
+    }
+
+
+def verify_board_file(path: str) -> Dict:
+    """Verify one pickled board, reusing the cached result if its content is unchanged"""
+    try:
+        with open(path, 'rb') as f:
+            game_data = pickle.load(f)
+        board, queens = np.asarray(game_data['board']), game_data['queens']
+    except Exception as e:
+        return {"path": path, "valid": False, "error": str(e), "cached": False}
+
+    content_hash = get_board_content_hash(board, queens)
+    if content_hash in _cache:
+        result = dict(_cache[content_hash])
+        cached = True
+    else:
+        result = verify_board(board, queens)
+        cached = False
+
+    result.update({"path": path, "hash": content_hash, "cached": cached})
+    return result
+
+
+def find_board_files(folders: List[str]) -> List[str]:
+    paths = []
+    for folder in folders:
+        paths.extend(glob(os.path.join(folder, "**", "*.pkl"), recursive=True))
+    return sorted(paths)
+
+
+def verify_corpus(paths: List[str], num_processes: int,
+                  cache: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    Verify every board file in parallel. Boards whose content hash is in cache are
+    not solved again. Results are in the same order as paths.
+    """
+    cache = cache or {}
+    # Big chunks keep per-task overhead low on large corpora
+    chunksize = max(1, min(256, len(paths) // (num_processes * 8)))
+    start_time = time.time()
+    results = []
+
+    with mp.Pool(processes=num_processes, initializer=_init_worker,
+                 initargs=(cache,)) as pool:
+        for result in pool.imap(verify_board_file, paths, chunksize=chunksize):
+            results.append(result)
+            if len(results) % 1000 == 0:
+                elapsed = time.time() - start_time
+                print(f"Verified {len(results)}/{len(paths)} boards, "
+                      f"{len(results) / elapsed:.0f} boards/sec")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check every board in a corpus has exactly one solution matching "
+                    "its stored queens")
+    parser.add_argument('folders',
+                        nargs='*',
+                        default=["pregenerated_games", "output_folder"],
+                        help="Folders of pickled boards to verify")
+    parser.add_argument('--num_processes', type=int, default=os.cpu_count())
+    parser.add_argument('--cache_path',
+                        type=str,
+                        default="verify_cache.json",
+                        help="Results by board content hash, unchanged boards are "
+                             "skipped on later runs")
+    parser.add_argument('--report_path',
+                        type=str,
+                        default="verify_report.json",
+                        help="Where to write the json report")
+
+    args = parser.parse_args()
+
+    cache = {}
+    if os.path.exists(args.cache_path):
+        with open(args.cache_path) as f:
+            cache = json.load(f)
+
+    paths = find_board_files([f for f in args.folders if os.path.exists(f)])
+    print(f"Verifying {len(paths)} boards on {args.num_processes} cores, "
+          f"{len(cache)} cached results")
+
+    start_time = time.time()
+    results = verify_corpus(paths, args.num_processes, cache)
+    elapsed_time = time.time() - start_time
+
+    for result in results:
+        if "hash" in result and not result["cached"]:
+            cache[result["hash"]] = {key: result[key] for key in
+                                     ["num_solutions", "queens_match", "valid",
+                                      "solve_seconds"]}
+    with open(args.cache_path, 'w') as f:
+        json.dump(cache, f)
+
+    invalid = [r for r in results if not r["valid"]]
+    summary = {
+        "num_boards": len(results),
+        "num_invalid": len(invalid),
+        "num_cached": sum(r["cached"] for r in results),
+        "total_seconds": elapsed_time,
+        "total_solve_seconds": sum(r.get("solve_seconds", 0) for r in results
+                                   if not r["cached"]),
+    }
+    with open(args.report_path, 'w') as f:
+        json.dump({"summary": summary, "boards": results}, f, indent=1)
+
+    for result in invalid:
+        print(f"Invalid board {result['path']}: {result}")
+    print(f"Verified {len(results)} boards in {elapsed_time:.2f} seconds, "
+          f"{len(invalid)} invalid, {summary['num_cached']} cached. "
+          f"Report saved to {args.report_path}")
+
+    sys.exit(1 if invalid else 0)
@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import numpy as np
+
+from typing import List, Tuple
+
+
+def encode_grid(grid: np.ndarray) -> str:
+    """Encode a grid of small non-negative ints as base64 uint8 bytes, row by row"""
+    return base64.b64encode(np.asarray(grid, dtype=np.uint8).tobytes()).decode('ascii')
+
+
+def decode_grid(encoded: str, size: int) -> np.ndarray:
+    """Decode a grid encoded with encode_grid back to a size x size int array"""
+    data = np.frombuffer(base64.b64decode(encoded), dtype=np.uint8)
+    return data.reshape(size, size).astype(int)
+
+
+def get_regions_id(regions: np.ndarray) -> str:
+    """Content id of a region layout, the same layout always gets the same id"""
+    data = np.asarray(regions, dtype=np.uint8).tobytes()
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def apply_mark_deltas(marks: np.ndarray, deltas: List[Tuple[int, int]]) -> bool:
+    """
+    Apply (cell, value) mark updates in place, cell being row * size + col. Returns
+    False without changing marks if any delta is invalid.
+    """
+    size = marks.shape[0]
+    if not isinstance(deltas, (list, tuple)):
+        return False
+    for delta in deltas:
+        if not isinstance(delta, (list, tuple)) or len(delta) != 2:
+            return False
+        cell, value = delta
+        # bool is a subclass of int, but true/false aren't cells or marks
+        if not _is_int(cell) or not 0 <= cell < size * size:
+            return False
+        if not _is_int(value) or value not in (0, 1, 2):
+            return False
+
+    for cell, value in deltas:
+        marks[cell // size, cell % size] = value
+    return True